@@ -1,17 +1,73 @@
 # app/api/admin.py
-from flask import request, jsonify
+from flask import request, jsonify, send_from_directory, current_app
 from flask_login import login_required, current_user
-from app.models import User, Role, Subject, Chapter, Quiz, Question, Score
+from app.models import User, Role, Subject, Chapter, Quiz, Question, Score, ExportRequest
 from app.extensions import db
 from app.api import api_bp
 from datetime import datetime
+import os
+import io
+import csv
+import json
 from sqlalchemy import func
 from sqlalchemy.sql import text
 
 from app.tasks.reminder_tasks import send_daily_reminders
 from app.tasks.report_tasks import send_monthly_reports
-from app.utils.cache import cache, limiter, clear_cache_by_pattern
-
+from app.tasks.export_tasks import generate_cohort_quiz_history_csv
+from app.utils.db_routing import replica_read
+from app.utils.cache import cache, limiter, tagged_key, bump_generation, get_generation, read_primary_if_recent
+from app.utils.answer_keys import bump_quiz_version
+from app.utils.db_tuning import pool_metrics
+from app.utils.pagination import field, isoformat, keyset_page
+from app.utils.batch_mutations import apply_batch, BatchError
+from app.utils.catalog_delete import delete_catalog
+
+
+# Bulk question import: rows per executemany batch, and per-row errors reported back
+QUESTION_IMPORT_BATCH_SIZE = 1000
+MAX_IMPORT_ERRORS = 1000
+
+# Materialized admin dashboard snapshot
+ADMIN_STATS_CACHE_KEY = "admin_statistics"
+ADMIN_STATS_TTL = 60
+
+# Output fields of the admin list endpoints, selectable with ?fields=
+USER_FIELDS = {
+    'id': field(User.id),
+    'username': field(User.username),
+    'full_name': field(User.full_name),
+    'qualification': field(User.qualification),
+    'dob': isoformat(User.dob),
+    'role': field(User.role, build=lambda row: row.role.value)
+}
+SUBJECT_FIELDS = {
+    'id': field(Subject.id),
+    'name': field(Subject.name),
+    'description': field(Subject.description)
+}
+CHAPTER_FIELDS = {
+    'id': field(Chapter.id),
+    'name': field(Chapter.name),
+    'description': field(Chapter.description),
+    'subject_id': field(Chapter.subject_id)
+}
+QUIZ_FIELDS = {
+    'id': field(Quiz.id),
+    'chapter_id': field(Quiz.chapter_id),
+    'date_of_quiz': isoformat(Quiz.date_of_quiz),
+    'end_date': isoformat(Quiz.end_date),
+    'time_duration': field(Quiz.time_duration),
+    'remarks': field(Quiz.remarks)
+}
+QUESTION_FIELDS = {
+    'id': field(Question.id),
+    'quiz_id': field(Question.quiz_id),
+    'question_statement': field(Question.question_statement),
+    'options': field(Question.option1, Question.option2, Question.option3, Question.option4,
+                     build=lambda row: [row.option1, row.option2, row.option3, row.option4]),
+    'correct_option': field(Question.correct_option)
+}
 
 # Admin middleware
 def admin_required(f):
@@ -23,26 +79,40 @@ def admin_required(f):
     decorated_function.__name__ = f.__name__
     return decorated_function
 
+
+def list_page(key, fields, id_column, *filters):
+    """Respond with one keyset page of a list endpoint (?after_id=, ?limit=, ?fields=)."""
+    try:
+        items, next_after_id = keyset_page(
+            fields, id_column, filters,
+            requested_fields=request.args.get('fields'),
+            after_id=request.args.get('after_id', type=int),
+            limit=request.args.get('limit', type=int)
+        )
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    return jsonify({
+        key: items,
+        'next_after_id': next_after_id
+    })
+
 # User management
 @api_bp.route('/admin/users', methods=['GET'])
 @admin_required
-@cache.cached(timeout=10, key_prefix="admin_users_list")
+@replica_read
+@cache.cached(timeout=300, key_prefix=tagged_key('users'))
 def get_users():
-    users = User.query.all()
-    return jsonify({
-        'users': [user.to_dict() for user in users]
-    })
+    return list_page('users', USER_FIELDS, User.id)
 
 
 
 # Subject management
 @api_bp.route('/admin/subjects', methods=['GET'])
 @admin_required
+@replica_read
+@cache.cached(timeout=3600, key_prefix=tagged_key('catalog'))
 def get_subjects():
-    subjects = Subject.query.all()
-    return jsonify({
-        'subjects': [subject.to_dict() for subject in subjects]
-    })
+    return list_page('subjects', SUBJECT_FIELDS, Subject.id)
 
 
 
@@ -59,10 +129,8 @@ def create_subject():
 
     db.session.add(new_subject)
     db.session.commit()
-
-    # clear_cache_by_pattern("user_subjects")
-    # clear_cache_by_pattern("admin_statistics")
-
+    invalidate_admin_statistics()
+    bump_generation('catalog')
     
     return jsonify({
         'message': 'Subject created successfully',
@@ -80,6 +148,8 @@ def update_subject(subject_id):
     subject.description = data.get('description', subject.description)
     
     db.session.commit()
+    invalidate_admin_statistics()
+    bump_generation('catalog')
     return jsonify({
         'message': 'Subject updated successfully',
         'subject': subject.to_dict()
@@ -89,9 +159,14 @@ def update_subject(subject_id):
 @api_bp.route('/admin/subjects/<int:subject_id>', methods=['DELETE'])
 @admin_required
 def delete_subject(subject_id):
-    subject = Subject.query.get_or_404(subject_id)
-    db.session.delete(subject)
+    Subject.query.get_or_404(subject_id)
+    # Set-based cascade over chapters, quizzes, questions and scores
+    quiz_ids = delete_catalog('subject', [subject_id])
     db.session.commit()
+    invalidate_admin_statistics()
+    bump_generation('catalog', 'questions')  # Their questions went with them
+    for quiz_id in quiz_ids:
+        bump_quiz_version(quiz_id)
     return jsonify({
         'message': 'Subject deleted successfully'
     })
@@ -102,17 +177,12 @@ def delete_subject(subject_id):
 # Chapter management
 @api_bp.route('/admin/chapters', methods=['GET'])
 @admin_required
+@replica_read
+@cache.cached(timeout=1800, key_prefix=tagged_key('catalog'))
 def get_chapters():
     subject_id = request.args.get('subject_id', type=int)
-
-    print(subject_id)
-    if subject_id:
-        chapters = Chapter.query.filter_by(subject_id=subject_id).all()
-    else:
-        chapters = Chapter.query.all()
-    return jsonify({
-        'chapters': [chapter.to_dict() for chapter in chapters]
-    })
+    filters = [Chapter.subject_id == subject_id] if subject_id else []
+    return list_page('chapters', CHAPTER_FIELDS, Chapter.id, *filters)
 
 @api_bp.route('/admin/chapters', methods=['POST'])
 @admin_required
@@ -127,6 +197,8 @@ def create_chapter():
 
     db.session.add(new_chapter)
     db.session.commit()
+    invalidate_admin_statistics()
+    bump_generation('catalog')
     return jsonify({
         'message': 'Chapter created successfully',
         'chapter': new_chapter.to_dict()
@@ -143,6 +215,8 @@ def update_chapter(chapter_id):
     chapter.subject_id = data.get('subject_id', chapter.subject_id)
     
     db.session.commit()
+    invalidate_admin_statistics()
+    bump_generation('catalog')
     return jsonify({
         'message': 'Chapter updated successfully',
         'chapter': chapter.to_dict()
@@ -151,27 +225,60 @@ def update_chapter(chapter_id):
 @api_bp.route('/admin/chapters/<int:chapter_id>', methods=['DELETE'])
 @admin_required
 def delete_chapter(chapter_id):
-    chapter = Chapter.query.get_or_404(chapter_id)
-    db.session.delete(chapter)
+    Chapter.query.get_or_404(chapter_id)
+    quiz_ids = delete_catalog('chapter', [chapter_id])
     db.session.commit()
+    invalidate_admin_statistics()
+    bump_generation('catalog', 'questions')  # Their questions went with them
+    for quiz_id in quiz_ids:
+        bump_quiz_version(quiz_id)
     return jsonify({
         'message': 'Chapter deleted successfully'
     })
 
 
 
+# Batch mutations
+@api_bp.route('/admin/batch', methods=['POST'])
+@admin_required
+def apply_admin_batch():
+    """Apply an ordered list of subject/chapter/quiz operations in one transaction."""
+    data = request.get_json(silent=True) or {}
+    try:
+        results, touched_quizzes = apply_batch(data.get('operations'))
+    except BatchError as e:
+        db.session.rollback()
+        return jsonify({
+            'message': 'Batch rejected, no changes were saved',
+            'index': e.index,
+            'error': e.message
+        }), 400
+    
+    db.session.commit()
+    invalidate_admin_statistics()
+    if any(result['op'] == 'delete' for result in results):
+        # Deletes cascade over the quizzes' questions
+        bump_generation('catalog', 'questions')
+    else:
+        bump_generation('catalog')
+    for quiz_id in touched_quizzes:
+        bump_quiz_version(quiz_id)
+    return jsonify({
+        'message': f'Applied {len(results)} operations',
+        'results': results
+    })
+
+
+
 # Quiz management
 @api_bp.route('/admin/quizzes', methods=['GET'])
 @admin_required
+@replica_read
+@cache.cached(timeout=1800, key_prefix=tagged_key('catalog'))
 def get_quizzes():
     chapter_id = request.args.get('chapter_id', type=int)
-    if chapter_id:
-        quizzes = Quiz.query.filter_by(chapter_id=chapter_id).all()
-    else:
-        quizzes = Quiz.query.all()
-    return jsonify({
-        'quizzes': [quiz.to_dict() for quiz in quizzes]
-    })
+    filters = [Quiz.chapter_id == chapter_id] if chapter_id else []
+    return list_page('quizzes', QUIZ_FIELDS, Quiz.id, *filters)
 
 @api_bp.route('/admin/quizzes', methods=['POST'])
 @admin_required
@@ -195,6 +302,8 @@ def create_quiz():
     )
     db.session.add(new_quiz)
     db.session.commit()
+    invalidate_admin_statistics()
+    bump_generation('catalog')
     return jsonify({
         'message': 'Quiz created successfully',
         'quiz': new_quiz.to_dict()
@@ -226,6 +335,9 @@ def update_quiz(quiz_id):
     quiz.remarks = data.get('remarks', quiz.remarks)
     
     db.session.commit()
+    invalidate_admin_statistics()
+    bump_generation('catalog')
+    bump_quiz_version(quiz_id)
     return jsonify({
         'message': 'Quiz updated successfully',
         'quiz': quiz.to_dict()
@@ -234,9 +346,12 @@ def update_quiz(quiz_id):
 @api_bp.route('/admin/quizzes/<int:quiz_id>', methods=['DELETE'])
 @admin_required
 def delete_quiz(quiz_id):
-    quiz = Quiz.query.get_or_404(quiz_id)
-    db.session.delete(quiz)
+    Quiz.query.get_or_404(quiz_id)
+    delete_catalog('quiz', [quiz_id])
     db.session.commit()
+    invalidate_admin_statistics()
+    bump_generation('catalog', 'questions')  # Their questions went with them
+    bump_quiz_version(quiz_id)
     return jsonify({
         'message': 'Quiz deleted successfully'
     })
@@ -244,15 +359,12 @@ def delete_quiz(quiz_id):
 # Question management
 @api_bp.route('/admin/questions', methods=['GET'])
 @admin_required
+@replica_read
+@cache.cached(timeout=1800, key_prefix=tagged_key('questions'))
 def get_questions():
     quiz_id = request.args.get('quiz_id', type=int)
-    if quiz_id:
-        questions = Question.query.filter_by(quiz_id=quiz_id).all()
-    else:
-        questions = Question.query.all()
-    return jsonify({
-        'questions': [question.to_dict(include_correct=True) for question in questions]
-    })
+    filters = [Question.quiz_id == quiz_id] if quiz_id else []
+    return list_page('questions', QUESTION_FIELDS, Question.id, *filters)
 
 @api_bp.route('/admin/questions', methods=['POST'])
 @admin_required
@@ -270,16 +382,204 @@ def create_question():
     )
     db.session.add(new_question)
     db.session.commit()
+    invalidate_admin_statistics()
+    bump_generation('questions')
+    bump_quiz_version(new_question.quiz_id)
     return jsonify({
         'message': 'Question created successfully',
         'question': new_question.to_dict(include_correct=True)
     }), 201
 
+def _is_int(value):
+    # bool is an int subclass
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _parse_question_row(row, default_quiz_id, quiz_exists):
+    """Validate one imported row; return insert params or raise ValueError."""
+    quiz_id = row.get('quiz_id')
+    if quiz_id is None:
+        quiz_id = default_quiz_id
+    if not _is_int(quiz_id):
+        raise ValueError('quiz_id must be an integer')
+    if not quiz_exists(quiz_id):
+        raise ValueError(f'Quiz {quiz_id} does not exist')
+    
+    statement = row.get('question_statement')
+    if statement is not None and not isinstance(statement, str):
+        raise ValueError('question_statement must be a string')
+    statement = (statement or '').strip()
+    if not statement:
+        raise ValueError('question_statement is required')
+    
+    options = row.get('options')
+    if options is None:
+        options = [row.get(f'option{i}') for i in range(1, 5)]
+    if not isinstance(options, list) or len(options) != 4:
+        raise ValueError('exactly 4 options are required')
+    if any(option is not None and not isinstance(option, str) for option in options):
+        raise ValueError('options must be strings')
+    options = [(option or '').strip() for option in options]
+    if not all(options):
+        raise ValueError('options must not be empty')
+    if any(len(option) > 255 for option in options):
+        raise ValueError('options must be at most 255 characters')
+    
+    correct_option = row.get('correct_option')
+    if not _is_int(correct_option):
+        raise ValueError('correct_option must be an integer')
+    if correct_option not in (1, 2, 3, 4):
+        raise ValueError('correct_option must be between 1 and 4')
+    
+    return {
+        'quiz_id': quiz_id,
+        'question_statement': statement,
+        'option1': options[0],
+        'option2': options[1],
+        'option3': options[2],
+        'option4': options[3],
+        'correct_option': correct_option
+    }
+
+
+# CSV cells are text; these columns are turned into ints when they hold one
+CSV_INT_COLUMNS = ('quiz_id', 'correct_option')
+
+
+def _csv_row(row):
+    for column in CSV_INT_COLUMNS:
+        value = (row.get(column) or '').strip()
+        if not value:
+            row[column] = None
+        elif value.isdigit():
+            row[column] = int(value)
+    return row
+
+
+def _read_import_rows(stream, import_format):
+    """Yield (line number, dict or ValueError) from a JSON Lines or CSV upload, one row at a time.
+    
+    CSV rows are numbered by the physical line they start on, so quoted multi-line
+    fields do not shift the numbers of later rows.
+    """
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if import_format == 'csv':
+        reader = csv.DictReader(text_stream)
+        last_line = 0
+        try:
+            # Reading the header first makes line_num point past it
+            reader.fieldnames
+            last_line = reader.line_num
+            for row in reader:
+                yield last_line + 1, _csv_row(row)
+                last_line = reader.line_num
+        except csv.Error as e:
+            # e.g. an oversized field; the reader cannot resync, so this ends the import
+            yield reader.line_num, ValueError(f'invalid CSV, rest of the file skipped: {e}')
+        return
+    
+    for row_number, line in enumerate(text_stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield row_number, ValueError('invalid JSON')
+            continue
+        if not isinstance(row, dict):
+            yield row_number, ValueError('each line must be a JSON object')
+            continue
+        yield row_number, row
+
+
+@api_bp.route('/admin/questions/import', methods=['POST'])
+@admin_required
+def import_questions():
+    """Bulk-load questions from a JSON Lines or CSV body.
+    
+    JSON Lines rows look like create_question's payload; CSV needs quiz_id,
+    question_statement, option1-option4 and correct_option columns. ?quiz_id= fills in
+    rows without one. Valid rows are inserted in batches in one transaction; with
+    ?atomic=true any invalid row aborts the whole import.
+    """
+    import_format = request.args.get('format')
+    if import_format is None:
+        import_format = 'csv' if request.mimetype in ('text/csv', 'application/csv') else 'jsonl'
+    if import_format not in ('jsonl', 'csv'):
+        return jsonify({'message': 'format must be jsonl or csv'}), 400
+    default_quiz_id = request.args.get('quiz_id', type=int)
+    atomic = request.args.get('atomic', 'false').lower() in ['true', 'on', '1']
+    
+    known_quizzes = {}
+    def quiz_exists(quiz_id):
+        if quiz_id not in known_quizzes:
+            known_quizzes[quiz_id] = db.session.query(Quiz.id).filter_by(id=quiz_id).first() is not None
+        return known_quizzes[quiz_id]
+    
+    imported = 0
+    failed = 0
+    errors = []
+    batch = []
+    touched_quizzes = set()
+    
+    try:
+        for row_number, row in _read_import_rows(request.stream, import_format):
+            try:
+                if isinstance(row, ValueError):
+                    raise row
+                params = _parse_question_row(row, default_quiz_id, quiz_exists)
+            except ValueError as e:
+                failed += 1
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    errors.append({'row': row_number, 'message': str(e)})
+                continue
+            
+            if atomic and failed:
+                # Already aborting; keep validating to report every error
+                continue
+            batch.append(params)
+            touched_quizzes.add(params['quiz_id'])
+            if len(batch) >= QUESTION_IMPORT_BATCH_SIZE:
+                db.session.execute(db.insert(Question), batch)
+                imported += len(batch)
+                batch = []
+        
+        if batch:
+            db.session.execute(db.insert(Question), batch)
+            imported += len(batch)
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({'message': 'Import must be UTF-8 encoded'}), 400
+    
+    if failed and atomic:
+        db.session.rollback()
+        return jsonify({
+            'message': 'Import aborted, no questions were saved',
+            'imported': 0,
+            'failed': failed,
+            'errors': errors
+        }), 400
+    
+    db.session.commit()
+    if imported:
+        invalidate_admin_statistics()
+        bump_generation('questions')
+        for quiz_id in touched_quizzes:
+            bump_quiz_version(quiz_id)
+    
+    return jsonify({
+        'message': f'Imported {imported} questions' + (f', {failed} rows failed' if failed else ''),
+        'imported': imported,
+        'failed': failed,
+        'errors': errors
+    }), 201 if imported else 400
+
 @api_bp.route('/admin/questions/<int:question_id>', methods=['PUT'])
 @admin_required
 def update_question(question_id):
     question = Question.query.get_or_404(question_id)
     data = request.get_json()
+    old_quiz_id = question.quiz_id
     
     question.quiz_id = data.get('quiz_id', question.quiz_id)
     question.question_statement = data.get('question_statement', question.question_statement)
@@ -293,6 +593,11 @@ def update_question(question_id):
     question.correct_option = data.get('correct_option', question.correct_option)
     
     db.session.commit()
+    invalidate_admin_statistics()
+    bump_generation('questions')
+    bump_quiz_version(old_quiz_id)
+    if question.quiz_id != old_quiz_id:
+        bump_quiz_version(question.quiz_id)
     return jsonify({
         'message': 'Question updated successfully',
         'question': question.to_dict(include_correct=True)
@@ -302,8 +607,12 @@ def update_question(question_id):
 @admin_required
 def delete_question(question_id):
     question = Question.query.get_or_404(question_id)
+    quiz_id = question.quiz_id
     db.session.delete(question)
     db.session.commit()
+    invalidate_admin_statistics()
+    bump_generation('questions')
+    bump_quiz_version(quiz_id)
     return jsonify({
         'message': 'Question deleted successfully'
     })
@@ -314,6 +623,8 @@ def delete_question(question_id):
 
 @api_bp.route('/admin/subjects/<int:subject_id>', methods=['GET'])
 @admin_required
+@replica_read
+@cache.cached(timeout=3600, key_prefix=tagged_key('catalog'))
 def get_subject(subject_id):
     subject = Subject.query.get_or_404(subject_id)
     return jsonify({
@@ -322,6 +633,8 @@ def get_subject(subject_id):
 
 @api_bp.route('/admin/chapters/<int:chapter_id>', methods=['GET'])
 @admin_required
+@replica_read
+@cache.cached(timeout=3600, key_prefix=tagged_key('catalog'))
 def get_chapter(chapter_id):
     chapter = Chapter.query.get_or_404(chapter_id)
     return jsonify({
@@ -330,6 +643,8 @@ def get_chapter(chapter_id):
 
 @api_bp.route('/admin/quizzes/<int:quiz_id>', methods=['GET'])
 @admin_required
+@replica_read
+@cache.cached(timeout=3600, key_prefix=tagged_key('catalog'))
 def get_quiz(quiz_id):
     quiz = Quiz.query.get_or_404(quiz_id)
     return jsonify({
@@ -338,64 +653,77 @@ def get_quiz(quiz_id):
 
 
 
-@api_bp.route('/admin/statistics', methods=['GET'])
-@admin_required
-# @cache.cached(timeout=900, key_prefix="admin_statistics")
-def get_admin_statistics():
-    # Get counts
-    total_subjects = Subject.query.count()
-    total_chapters = Chapter.query.count()
-    total_quizzes = Quiz.query.count()
-    total_questions = Question.query.count()
-    total_users = User.query.filter_by(role=Role.USER).count()
-    total_attempts = Score.query.count()
+def build_admin_statistics():
+    """Compute the admin dashboard snapshot with a fixed number of set-based queries."""
+    # All headline counts in a single round trip
+    counts = db.session.query(
+        db.session.query(func.count(Subject.id)).scalar_subquery(),
+        db.session.query(func.count(Chapter.id)).scalar_subquery(),
+        db.session.query(func.count(Quiz.id)).scalar_subquery(),
+        db.session.query(func.count(Question.id)).scalar_subquery(),
+        db.session.query(func.count(User.id)).filter(User.role == Role.USER).scalar_subquery(),
+        db.session.query(func.count(Score.id)).scalar_subquery()
+    ).one()
+    total_subjects, total_chapters, total_quizzes, total_questions, total_users, total_attempts = counts
     
     # Get recent users (last 5)
     recent_users = User.query.filter_by(role=Role.USER).order_by(User.id.desc()).limit(5).all()
     
-    # Get quiz completion statistics
+    # Get quiz completion statistics, joined to chapter/subject names in SQL
+    attempt_count = func.count(Score.id).label('attempt_count')
     quiz_stats = db.session.query(
         Quiz.id,
-        func.count(Score.id).label('attempt_count'),
+        Quiz.date_of_quiz,
+        Chapter.name,
+        Subject.name,
+        attempt_count,
         func.avg(Score.total_scored * 100.0 / Score.max_score).label('avg_score')
-    ).join(Score, Quiz.id == Score.quiz_id, isouter=True).group_by(Quiz.id).order_by(text('attempt_count DESC')).limit(5).all()
+    ).join(
+        Chapter, Quiz.chapter_id == Chapter.id
+    ).join(
+        Subject, Chapter.subject_id == Subject.id
+    ).join(
+        Score, Quiz.id == Score.quiz_id, isouter=True
+    ).group_by(
+        Quiz.id, Quiz.date_of_quiz, Chapter.name, Subject.name
+    ).order_by(attempt_count.desc()).limit(5).all()
     
     top_quizzes = []
-    for quiz_id, attempt_count, avg_score in quiz_stats:
-        quiz = Quiz.query.get(quiz_id)
-        chapter = Chapter.query.get(quiz.chapter_id)
-        subject = Subject.query.get(chapter.subject_id)
-        
+    for quiz_id, quiz_date, chapter_name, subject_name, attempts, avg_score in quiz_stats:
         if avg_score is None:
             avg_score = 0
             
         top_quizzes.append({
             'quiz_id': quiz_id,
-            'quiz_date': quiz.date_of_quiz.isoformat(),
-            'chapter_name': chapter.name,
-            'subject_name': subject.name,
-            'attempt_count': attempt_count,
+            'quiz_date': quiz_date.isoformat(),
+            'chapter_name': chapter_name,
+            'subject_name': subject_name,
+            'attempt_count': attempts,
             'avg_score': round(avg_score, 2)
         })
     
-    # Get subject statistics
+    # Get subject statistics with one grouped join
+    subject_rows = db.session.query(
+        Subject.id,
+        Subject.name,
+        func.count(func.distinct(Chapter.id)),
+        func.count(Quiz.id)
+    ).outerjoin(
+        Chapter, Chapter.subject_id == Subject.id
+    ).outerjoin(
+        Quiz, Quiz.chapter_id == Chapter.id
+    ).group_by(Subject.id, Subject.name).order_by(Subject.id).all()
+    
     subject_stats = []
-    subjects = Subject.query.all()
-    for subject in subjects:
-        chapter_count = Chapter.query.filter_by(subject_id=subject.id).count()
-        
-        # Get all quiz IDs associated with this subject
-        chapter_ids = [c.id for c in Chapter.query.filter_by(subject_id=subject.id).all()]
-        quiz_count = Quiz.query.filter(Quiz.chapter_id.in_(chapter_ids)).count() if chapter_ids else 0
-        
+    for subject_id, subject_name, chapter_count, quiz_count in subject_rows:
         subject_stats.append({
-            'subject_id': subject.id,
-            'subject_name': subject.name,
+            'subject_id': subject_id,
+            'subject_name': subject_name,
             'chapter_count': chapter_count,
             'quiz_count': quiz_count
         })
     
-    return jsonify({
+    return {
         'counts': {
             'subjects': total_subjects,
             'chapters': total_chapters,
@@ -407,9 +735,112 @@ def get_admin_statistics():
         'recent_users': [user.to_dict() for user in recent_users],
         'top_quizzes': top_quizzes,
         'subject_stats': subject_stats
+    }
+
+
+def invalidate_admin_statistics():
+    """Orphan the dashboard snapshot so the next request rebuilds it."""
+    bump_generation('admin_statistics')
+
+
+@api_bp.route('/admin/statistics', methods=['GET'])
+@admin_required
+@replica_read
+def get_admin_statistics():
+    # Served from a snapshot that admin writes invalidate; the TTL picks up new users and attempts
+    generation = get_generation('admin_statistics')
+    cache_key = f"{ADMIN_STATS_CACHE_KEY}_{generation}"
+    snapshot = cache.get(cache_key)
+    if snapshot is None:
+        read_primary_if_recent(generation)
+        snapshot = build_admin_statistics()
+        cache.set(cache_key, snapshot, timeout=ADMIN_STATS_TTL)
+    return jsonify(snapshot)
+
+
+@api_bp.route('/admin/pool-metrics', methods=['GET'])
+@admin_required
+def get_pool_metrics():
+    # Per process: each web worker reports its own pool
+    return jsonify({
+        'pid': os.getpid(),
+        'profile': current_app.config.get('DB_PROFILE'),
+        'pools': {bind or 'primary': pool_metrics(engine) for bind, engine in db.engines.items()}
     })
 
 
+# Cohort export
+@api_bp.route('/admin/export/quiz-history', methods=['POST'])
+@admin_required
+def request_cohort_quiz_history_export():
+    """Trigger asynchronous export of every user's quiz history."""
+    data = request.get_json(silent=True) or {}
+    subject_id = data.get('subject_id')
+    start_date = data.get('start_date')
+    end_date = data.get('end_date')
+    
+    try:
+        for value in (start_date, end_date):
+            if value:
+                datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'message': 'Invalid date format'}), 400
+    
+    export_request = ExportRequest(
+        user_id=current_user.id,
+        task_id='pending',  # Will be updated with actual task ID
+        kind='cohort',
+        status='pending'
+    )
+    db.session.add(export_request)
+    db.session.commit()
+    
+    task = generate_cohort_quiz_history_csv.delay(export_request.id, subject_id, start_date, end_date)
+    
+    export_request.task_id = str(task.id)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Export request received and is being processed.',
+        'export_id': export_request.id,
+        'status': 'pending'
+    })
+
+@api_bp.route('/admin/export/<int:export_id>', methods=['GET'])
+@admin_required
+@replica_read
+def get_cohort_export_status(export_id):
+    """Get status and progress of a cohort export."""
+    export_req = ExportRequest.query.filter_by(id=export_id, user_id=current_user.id, kind='cohort').first()
+    
+    if not export_req:
+        return jsonify({'message': 'Export request not found'}), 404
+    
+    return jsonify({
+        'export': export_req.to_dict()
+    })
+
+@api_bp.route('/admin/export/<int:export_id>/download', methods=['GET'])
+@admin_required
+@replica_read
+def download_cohort_export(export_id):
+    """Download a completed cohort export file."""
+    export_req = ExportRequest.query.filter_by(id=export_id, user_id=current_user.id, kind='cohort').first()
+    
+    if not export_req:
+        return jsonify({'message': 'Export request not found'}), 404
+        
+    if export_req.status != 'completed' or not export_req.file_name:
+        return jsonify({'message': 'Export is not ready for download'}), 400
+    
+    exports_dir = os.path.join(current_app.static_folder, 'exports')
+    return send_from_directory(
+        directory=exports_dir,
+        path=export_req.file_name,
+        as_attachment=True
+    )
+
+
 @api_bp.route('/admin/test/daily-reminders', methods=['GET'])
 @admin_required
 def test_daily_reminders():
@@ -441,22 +872,20 @@ def test_monthly_reports_debug():
     admin_id = current_user.id
     
     try:
-        # Import the task function
-        from app.tasks.report_tasks import send_monthly_reports
-        
-        # Call the function directly (not as a Celery task) for immediate debugging
-        result = send_monthly_reports()
+        # Run on a worker: the report renders charts in a process pool and aggregates
+        # the whole month, neither of which belongs in a web request
+        task = send_monthly_reports.delay()
         
         return jsonify({
-            'message': 'Monthly report test completed',
-            'result': str(result)
+            'message': 'Monthly report job initiated; its detailed log is in the worker output',
+            'task_id': str(task.id)
         })
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
         
         return jsonify({
-            'message': 'Error executing monthly report task',
+            'message': 'Error queueing monthly report task',
             'error': str(e),
             'traceback': error_trace
         }), 500
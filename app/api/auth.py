@@ -7,6 +7,8 @@ from urllib.parse import urlparse
 from app.models import User, Role
 from app.extensions import db
 from app.api import api_bp
+from app.utils.cache import bump_generation
+from app.utils.password_hashing import HashingBusy
 from datetime import datetime
 
 
@@ -20,10 +22,28 @@ def login():
     username = data.get('username')
     password = data.get('password')
     
+    # Fast reject: unknown usernames and empty passwords never queue for a hash
+    if not username or not password:
+        return jsonify({'message': 'Invalid username or password'}), 401
     user = User.query.filter_by(username=username).first()
-    if user is None or not user.check_password(password):
+    if user is None:
         return jsonify({'message': 'Invalid username or password'}), 401
     
+    try:
+        if not user.check_password(password):
+            return jsonify({'message': 'Invalid username or password'}), 401
+    except HashingBusy as e:
+        return jsonify({'message': str(e)}), 503, {'Retry-After': '1'}
+    
+    # Re-hash with the configured method/cost while we have the plaintext; under load
+    # this waits for a later login rather than failing this one
+    if user.password_needs_upgrade():
+        try:
+            user.set_password(password)
+            db.session.commit()
+        except HashingBusy:
+            pass
+    
     login_user(user)
     
     return jsonify({
@@ -62,10 +82,14 @@ def register():
         dob=dob,
         role=Role.USER
     )
-    user.set_password(password)
+    try:
+        user.set_password(password)
+    except HashingBusy as e:
+        return jsonify({'message': str(e)}), 503, {'Retry-After': '1'}
     
     db.session.add(user)
     db.session.commit()
+    bump_generation('users')
     
     return jsonify({
         'message': 'Registration successful',
@@ -83,9 +107,11 @@ def logout():
 @api_bp.route('/auth/current_user', methods=['GET'])
 def get_current_user():
     if current_user.is_authenticated:
+        # current_user is a cached principal; the profile comes from the users table
+        user = db.session.get(User, current_user.id)
         return jsonify({
             'authenticated': True,
-            'user': current_user.to_dict()
+            'user': user.to_dict()
         })
     else:
         return jsonify({
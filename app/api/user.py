@@ -9,14 +9,26 @@ from flask import send_from_directory, current_app
 from app.models import ExportRequest
 from app.tasks.export_tasks import generate_user_quiz_history_csv
 import os
-from app.utils.cache import cache, limiter, clear_cache_by_pattern
+import hashlib
+from app.utils.db_routing import replica_read, pin_to_primary
+from app.utils.cache import cache, limiter, tagged_key, bump_generation, read_primary_if_recent
+from app.utils.stats import get_subject_rollups, record_score_rollup
+from app.utils.answer_keys import get_quiz_version, grade_answers
+from app.utils.submission_queue import enqueue_score
 
 
+# Upper bound for ?limit= on paginated score history
+MAX_SCORES_PAGE_SIZE = 500
+
+# Pre-rendered quiz payloads are keyed by content version, so this only bounds memory
+QUIZ_PAYLOAD_TTL = 3600
+
 
 # User dashboard
 @api_bp.route('/user/subjects', methods=['GET'])
 @login_required
-# @cache.cached(timeout=3600, key_prefix=lambda: f"user_subjects_{current_user.id}")
+@replica_read
+@cache.cached(timeout=3600, key_prefix=tagged_key('catalog'))
 def get_user_subjects():
     subjects = Subject.query.all()
     return jsonify({
@@ -25,7 +37,8 @@ def get_user_subjects():
 
 @api_bp.route('/user/chapters', methods=['GET'])
 @login_required
-# @cache.cached(timeout=1800, key_prefix=lambda: f"user_chapters_{current_user.id}_{request.args.get('subject_id', '')}")
+@replica_read
+@cache.cached(timeout=1800, key_prefix=tagged_key('catalog'))
 def get_user_chapters():
     subject_id = request.args.get('subject_id', type=int)
     if subject_id:
@@ -38,6 +51,8 @@ def get_user_chapters():
 
 @api_bp.route('/user/quizzes', methods=['GET'])
 @login_required
+@replica_read
+@cache.cached(timeout=1800, key_prefix=tagged_key('catalog'))
 def get_user_quizzes():
     chapter_id = request.args.get('chapter_id', type=int)
     if chapter_id:
@@ -50,23 +65,48 @@ def get_user_quizzes():
 
 @api_bp.route('/user/quiz/<int:quiz_id>', methods=['GET'])
 @login_required
+@replica_read
 def get_quiz_details(quiz_id):
-    quiz = Quiz.query.get_or_404(quiz_id)
+    # The payload is the same for every student, so it is rendered once per content version
+    version = get_quiz_version(quiz_id, seed=False)
+    if version is None:
+        # Only seed tokens for real quizzes, not for every id a client makes up
+        db.session.query(Quiz.id).filter_by(id=quiz_id).first_or_404()
+        version = get_quiz_version(quiz_id)
+    cache_key = f"quiz_payload_{quiz_id}_{version}"
+    payload = cache.get(cache_key)
+    
+    if payload is None:
+        read_primary_if_recent(version)
+        quiz = Quiz.query.get_or_404(quiz_id)
+        questions = Question.query.filter_by(quiz_id=quiz_id).all()
+        
+        body = current_app.json.dumps({
+            'quiz': quiz.to_dict(),
+            'questions': [question.to_dict(include_correct=False) for question in questions]
+        }).encode('utf-8')
+        
+        payload = {
+            'date_of_quiz': quiz.date_of_quiz,
+            'end_date': quiz.end_date,
+            'body': body,
+            'etag': hashlib.sha256(body).hexdigest()
+        }
+        cache.set(cache_key, payload, timeout=QUIZ_PAYLOAD_TTL)
     
     # Check if the quiz is available
     now = datetime.now().date()
-    if quiz.date_of_quiz > now:
+    if payload['date_of_quiz'] > now:
         return jsonify({'message': 'This quiz is not yet available'}), 403
     
-    if quiz.end_date and now > quiz.end_date:
+    if payload['end_date'] and now > payload['end_date']:
         return jsonify({'message': 'This quiz has expired'}), 403
     
-    questions = Question.query.filter_by(quiz_id=quiz_id).all()
-    
-    return jsonify({
-        'quiz': quiz.to_dict(),
-        'questions': [question.to_dict(include_correct=False) for question in questions]
-    })
+    response = current_app.response_class(payload['body'], mimetype='application/json')
+    response.set_etag(payload['etag'])
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 # Do the same for submit_quiz endpoint:
 @api_bp.route('/user/quiz/<int:quiz_id>/submit', methods=['POST'])
@@ -87,17 +127,17 @@ def submit_quiz(quiz_id):
     data = request.get_json()
     answers = data.get('answers', {})
     
-    # Get all questions for this quiz
-    questions = Question.query.filter_by(quiz_id=quiz_id).all()
+    # Grade against the cached answer key instead of loading every Question
+    correct_answers, total_questions = grade_answers(quiz_id, answers)
     
-    # Calculate score
-    total_questions = len(questions)
-    correct_answers = 0
-    
-    for question in questions:
-        question_id_str = str(question.id)
-        if question_id_str in answers and answers[question_id_str] == question.correct_option:
-            correct_answers += 1
+    # Write-behind mode: acknowledge now, the spool flusher inserts the Score in a batch
+    if current_app.config.get('SUBMISSION_QUEUE_ENABLED'):
+        record = enqueue_score(quiz_id, current_user.id, correct_answers, total_questions)
+        pin_to_primary()
+        return jsonify({
+            'message': 'Quiz submitted successfully',
+            'score': {**record, 'id': None, 'provisional': True}
+        }), 202
     
     # Save score
     score = Score(
@@ -109,7 +149,10 @@ def submit_quiz(quiz_id):
     )
     
     db.session.add(score)
+    record_score_rollup(current_user.id, quiz, correct_answers, total_questions)
+    
     db.session.commit()
+    bump_generation(f"scores_{current_user.id}")
     
     return jsonify({
         'message': 'Quiz submitted successfully',
@@ -118,25 +161,59 @@ def submit_quiz(quiz_id):
 
 @api_bp.route('/user/scores', methods=['GET'])
 @login_required
-# @cache.cached(timeout=600, key_prefix=lambda: f"user_scores_{current_user.id}")
+@replica_read
+@cache.cached(timeout=600, key_prefix=tagged_key('catalog', 'scores_{user_id}'))
 def get_user_scores():
-    scores = Score.query.filter_by(user_id=current_user.id).all()
+    after_id = request.args.get('after_id', type=int)
+    limit = request.args.get('limit', type=int)
+    
+    # One joined query instead of a Quiz/Chapter/Subject lookup per score
+    query = db.session.query(Score, Quiz, Chapter, Subject).join(
+        Quiz, Score.quiz_id == Quiz.id
+    ).join(
+        Chapter, Quiz.chapter_id == Chapter.id
+    ).join(
+        Subject, Chapter.subject_id == Subject.id
+    ).filter(Score.user_id == current_user.id).order_by(Score.id)
+    
+    # Keyset pagination is opt-in so existing callers still get the full history
+    if after_id:
+        query = query.filter(Score.id > after_id)
+    if limit:
+        limit = min(max(limit, 1), MAX_SCORES_PAGE_SIZE)
+        query = query.limit(limit + 1)
+    
+    rows = query.all()
+    
+    next_after_id = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_after_id = rows[-1][0].id
+    
+    # The same quiz, chapter and subject repeat across attempts, serialize each once
+    quiz_dicts = {}
+    chapter_dicts = {}
+    subject_dicts = {}
     
     result = []
-    for score in scores:
-        quiz = Quiz.query.get(score.quiz_id)
-        chapter = Chapter.query.get(quiz.chapter_id)
-        subject = Subject.query.get(chapter.subject_id)
+    for score, quiz, chapter, subject in rows:
+        if quiz.id not in quiz_dicts:
+            quiz_dicts[quiz.id] = quiz.to_dict()
+        if chapter.id not in chapter_dicts:
+            chapter_dicts[chapter.id] = chapter.to_dict()
+        if subject.id not in subject_dicts:
+            subject_dicts[subject.id] = subject.to_dict()
         
         result.append({
             **score.to_dict(),
-            'quiz': quiz.to_dict(),
-            'chapter': chapter.to_dict(),
-            'subject': subject.to_dict()
+            'quiz': quiz_dicts[quiz.id],
+            'chapter': chapter_dicts[chapter.id],
+            'subject': subject_dicts[subject.id]
         })
     
     return jsonify({
-        'scores': result
+        'scores': result,
+        'next_after_id': next_after_id
     })
 
 
@@ -145,6 +222,8 @@ def get_user_scores():
 
 @api_bp.route('/user/subjects/<int:subject_id>', methods=['GET'])
 @login_required
+@replica_read
+@cache.cached(timeout=3600, key_prefix=tagged_key('catalog'))
 def get_user_subject(subject_id):
     subject = Subject.query.get_or_404(subject_id)
     return jsonify({
@@ -153,6 +232,8 @@ def get_user_subject(subject_id):
 
 @api_bp.route('/user/chapters/<int:chapter_id>', methods=['GET'])
 @login_required
+@replica_read
+@cache.cached(timeout=3600, key_prefix=tagged_key('catalog'))
 def get_user_chapter(chapter_id):
     chapter = Chapter.query.get_or_404(chapter_id)
     return jsonify({
@@ -163,77 +244,68 @@ def get_user_chapter(chapter_id):
 
 @api_bp.route('/user/statistics', methods=['GET'])
 @login_required
-# @cache.cached(timeout=1800, key_prefix=lambda: f"user_stats_{current_user.id}")
+@replica_read
+@cache.cached(timeout=1800, key_prefix=tagged_key('catalog', 'scores_{user_id}'))
 def get_user_statistics():
     user_id = current_user.id
     
-    # Get total counts
-    total_attempts = Score.query.filter_by(user_id=user_id).count()
-    
-    # Get scores
-    user_scores = Score.query.filter_by(user_id=user_id).all()
+    # Score history in one joined query, selecting only the columns we render
+    history_rows = db.session.query(
+        Score.time_stamp_of_attempt,
+        Score.total_scored,
+        Score.max_score,
+        Quiz.date_of_quiz,
+        Chapter.name.label('chapter_name'),
+        Subject.name.label('subject_name')
+    ).join(
+        Quiz, Score.quiz_id == Quiz.id
+    ).join(
+        Chapter, Quiz.chapter_id == Chapter.id
+    ).join(
+        Subject, Chapter.subject_id == Subject.id
+    ).filter(Score.user_id == user_id).order_by(Score.id).all()
     
-    # Calculate average score and build score history
-    avg_score = 0
-    total_correct = 0
-    total_questions = 0
     score_history = []
-    
-    for score in user_scores:
-        total_correct += score.total_scored
-        total_questions += score.max_score
-        
-        quiz = Quiz.query.get(score.quiz_id)
-        chapter = Chapter.query.get(quiz.chapter_id)
-        subject = Subject.query.get(chapter.subject_id)
-        
+    for row in history_rows:
         score_history.append({
-            'timestamp': score.time_stamp_of_attempt.isoformat(),
-            'quiz_date': quiz.date_of_quiz.isoformat(),
-            'chapter_name': chapter.name,
-            'subject_name': subject.name,
-            'score': score.total_scored,
-            'max_score': score.max_score,
-            'percentage': round((score.total_scored / score.max_score) * 100, 2)
+            'timestamp': row.time_stamp_of_attempt.isoformat(),
+            'quiz_date': row.date_of_quiz.isoformat(),
+            'chapter_name': row.chapter_name,
+            'subject_name': row.subject_name,
+            'score': row.total_scored,
+            'max_score': row.max_score,
+            'percentage': round((row.total_scored / row.max_score) * 100, 2) if row.max_score else 0
         })
     
-    if total_questions > 0:
-        avg_score = round((total_correct / total_questions) * 100, 2)
-    
-    # Get subject performance
-    subject_performance = {}
+    # Per-subject totals are aggregated in the database (or read from the rollup table)
+    total_attempts = 0
+    total_correct = 0
+    total_questions = 0
+    subject_stats = []
     
-    for score in user_scores:
-        quiz = Quiz.query.get(score.quiz_id)
-        chapter = Chapter.query.get(quiz.chapter_id)
-        subject = Subject.query.get(chapter.subject_id)
+    for subject_name, attempts, subject_correct, subject_questions in get_subject_rollups(user_id):
+        subject_correct = subject_correct or 0
+        subject_questions = subject_questions or 0
         
-        if subject.id not in subject_performance:
-            subject_performance[subject.id] = {
-                'subject_name': subject.name,
-                'total_correct': 0,
-                'total_questions': 0,
-                'attempts': 0
-            }
+        total_attempts += attempts
+        total_correct += subject_correct
+        total_questions += subject_questions
         
-        subject_performance[subject.id]['total_correct'] += score.total_scored
-        subject_performance[subject.id]['total_questions'] += score.max_score
-        subject_performance[subject.id]['attempts'] += 1
-    
-    # Calculate percentages for each subject
-    subject_stats = []
-    for subject_id, data in subject_performance.items():
-        if data['total_questions'] > 0:
-            percentage = round((data['total_correct'] / data['total_questions']) * 100, 2)
+        if subject_questions > 0:
+            percentage = round((subject_correct / subject_questions) * 100, 2)
         else:
             percentage = 0
             
         subject_stats.append({
-            'subject_name': data['subject_name'],
+            'subject_name': subject_name,
             'percentage': percentage,
-            'attempts': data['attempts']
+            'attempts': attempts
         })
     
+    avg_score = 0
+    if total_questions > 0:
+        avg_score = round((total_correct / total_questions) * 100, 2)
+    
     # Sort by attempts descending
     subject_stats.sort(key=lambda x: x['attempts'], reverse=True)
     
@@ -280,9 +352,10 @@ def request_quiz_history_export():
 
 @api_bp.route('/user/exports', methods=['GET'])
 @login_required
+@replica_read
 def get_user_exports():
     """Get list of user's export requests."""
-    exports = ExportRequest.query.filter_by(user_id=current_user.id).order_by(ExportRequest.created_at.desc()).all()
+    exports = ExportRequest.query.filter_by(user_id=current_user.id, kind='user').order_by(ExportRequest.created_at.desc()).all()
     
     return jsonify({
         'exports': [export_req.to_dict() for export_req in exports]
@@ -290,9 +363,10 @@ def get_user_exports():
 
 @api_bp.route('/user/export/<int:export_id>', methods=['GET'])
 @login_required
+@replica_read
 def get_export_status(export_id):
     """Get status of a specific export request."""
-    export_req = ExportRequest.query.filter_by(id=export_id, user_id=current_user.id).first()
+    export_req = ExportRequest.query.filter_by(id=export_id, user_id=current_user.id, kind='user').first()
     
     if not export_req:
         return jsonify({'message': 'Export request not found'}), 404
@@ -303,9 +377,10 @@ def get_export_status(export_id):
 
 @api_bp.route('/user/export/<int:export_id>/download', methods=['GET'])
 @login_required
+@replica_read
 def download_export(export_id):
     """Download a completed export file."""
-    export_req = ExportRequest.query.filter_by(id=export_id, user_id=current_user.id).first()
+    export_req = ExportRequest.query.filter_by(id=export_id, user_id=current_user.id, kind='user').first()
     
     if not export_req:
         return jsonify({'message': 'Export request not found'}), 404
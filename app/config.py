@@ -10,6 +10,71 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('SQLALCHEMY_DATABASE_URI', 'sqlite:///quiz_master.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # SQLite profile, applied to every new connection (ignored for other databases)
+    SQLITE_TUNING_ENABLED = os.environ.get('SQLITE_TUNING_ENABLED', 'true').lower() in ['true', 'on', '1']
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))  # milliseconds
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64000))  # negative = KiB
+    SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+    SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', 10))
+    SQLITE_MAX_OVERFLOW = int(os.environ.get('SQLITE_MAX_OVERFLOW', 10))
+    
+    # Read replica for @replica_read endpoints (unset = everything on the primary). Clients
+    # stay on the primary this many seconds after a write to read their own writes
+    DB_REPLICA_URI = os.environ.get('DB_REPLICA_URI')
+    DB_REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5))
+    # Longest replication lag tolerated; cache fills read the primary while a generation is younger
+    DB_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 5))
+    
+    # Connection pool profiles for client/server databases (Postgres). Web processes use
+    # 'web'; Celery workers load WorkerConfig, which selects 'worker'. Timeouts: seconds,
+    # except statement_timeout (milliseconds, Postgres only)
+    DB_PROFILE = os.environ.get('DB_PROFILE', 'web')
+    DB_POOL_PROFILES = {
+        'web': {
+            'pool_size': int(os.environ.get('DB_WEB_POOL_SIZE', 10)),
+            'max_overflow': int(os.environ.get('DB_WEB_MAX_OVERFLOW', 20)),
+            'pool_timeout': int(os.environ.get('DB_WEB_POOL_TIMEOUT', 10)),
+            'pool_recycle': int(os.environ.get('DB_WEB_POOL_RECYCLE', 1800)),
+            'pool_pre_ping': os.environ.get('DB_WEB_POOL_PRE_PING', 'true').lower() in ['true', 'on', '1'],
+            'statement_timeout': int(os.environ.get('DB_WEB_STATEMENT_TIMEOUT', 5000))
+        },
+        'worker': {
+            'pool_size': int(os.environ.get('DB_WORKER_POOL_SIZE', 2)),
+            'max_overflow': int(os.environ.get('DB_WORKER_MAX_OVERFLOW', 2)),
+            'pool_timeout': int(os.environ.get('DB_WORKER_POOL_TIMEOUT', 30)),
+            'pool_recycle': int(os.environ.get('DB_WORKER_POOL_RECYCLE', 1800)),
+            'pool_pre_ping': os.environ.get('DB_WORKER_POOL_PRE_PING', 'true').lower() in ['true', 'on', '1'],
+            'statement_timeout': int(os.environ.get('DB_WORKER_STATEMENT_TIMEOUT', 300000))
+        }
+    }
+    
+    # Serve per-subject statistics from the user_subject_stat rollup table
+    STATS_ROLLUP_ENABLED = os.environ.get('STATS_ROLLUP_ENABLED', 'false').lower() in ['true', 'on', '1']
+    
+    # Write-behind quiz submissions: scores are spooled to disk and inserted in batches
+    SUBMISSION_QUEUE_ENABLED = os.environ.get('SUBMISSION_QUEUE_ENABLED', 'false').lower() in ['true', 'on', '1']
+    SUBMISSION_SPOOL_DIR = os.environ.get('SUBMISSION_SPOOL_DIR')  # defaults to <instance>/score_spool
+    SUBMISSION_FLUSH_INTERVAL = float(os.environ.get('SUBMISSION_FLUSH_INTERVAL', 1.0))
+    SUBMISSION_BATCH_SIZE = int(os.environ.get('SUBMISSION_BATCH_SIZE', 500))
+    # Failed flushes before a spool file is set aside as <name>.dead
+    SUBMISSION_SPOOL_MAX_ATTEMPTS = int(os.environ.get('SUBMISSION_SPOOL_MAX_ATTEMPTS', 5))
+    
+    # Password hashing: werkzeug method (hashes made with another method or cost are
+    # upgraded on login), hashing threads per process and how many may wait for one
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None  # defaults to the CPU count
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 0)) or None  # defaults to 8 per worker
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 0.5))  # seconds
+    
+    # Deleting a subject/chapter/quiz only hides it; the nightly purge task removes it
+    # with its questions and scores after the retention period
+    SOFT_DELETE_ENABLED = os.environ.get('SOFT_DELETE_ENABLED', 'false').lower() in ['true', 'on', '1']
+    SOFT_DELETE_RETENTION_DAYS = int(os.environ.get('SOFT_DELETE_RETENTION_DAYS', 30))
+    PURGE_CHUNK_SIZE = int(os.environ.get('PURGE_CHUNK_SIZE', 10000))  # scores deleted per commit
+    
     # Mail settings
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
@@ -23,6 +88,12 @@ class Config:
     CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', REDIS_URL)
     CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', REDIS_URL)
     
+    # Cache: in-process LRU in front of Redis. Set CACHE_REDIS_URL empty for in-process only
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', REDIS_URL)
+    CACHE_LOCAL_MAX_BYTES = int(os.environ.get('CACHE_LOCAL_MAX_BYTES', 64 * 1024 * 1024))
+    CACHE_LOCAL_MAX_ITEMS = int(os.environ.get('CACHE_LOCAL_MAX_ITEMS', 10000))
+    CACHE_LOCAL_TIMEOUT = int(os.environ.get('CACHE_LOCAL_TIMEOUT', 30))
+    
     # CORS settings
     CORS_HEADERS = 'Content-Type'
 
@@ -38,3 +109,15 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@quizmaster.com')
+
+    # Bulk email fan-out: recipients per Celery sub-task and base retry delay in seconds
+    EMAIL_CHUNK_SIZE = int(os.environ.get('EMAIL_CHUNK_SIZE', 100))
+    EMAIL_RETRY_BACKOFF = int(os.environ.get('EMAIL_RETRY_BACKOFF', 30))
+    
+    # Processes used to render monthly report charts (defaults to the CPU count)
+    CHART_RENDER_WORKERS = int(os.environ.get('CHART_RENDER_WORKERS', 0)) or None
+
+
+class WorkerConfig(Config):
+    """Configuration for Celery worker processes."""
+    DB_PROFILE = 'worker'
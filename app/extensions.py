@@ -3,16 +3,24 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_mail import Mail
 from flask_cors import CORS
+from app.utils.db_routing import RoutingSession
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 mail = Mail()
 cors = CORS()
 
 def init_extensions(app):
     """Initialize all Flask extensions"""
+    from app.utils.db_tuning import configure_engine_options, apply_sqlite_pragmas
+    from app.utils.catalog_delete import init_soft_delete
+    configure_engine_options(app)
     db.init_app(app)
+    init_soft_delete(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_sqlite_pragmas(engine, app.config)
     login_manager.init_app(app)
     mail.init_app(app)
     cors.init_app(app, resources={r"/api/*": {"origins": "*"}})
@@ -20,7 +28,8 @@ def init_extensions(app):
     # Set up login manager
     login_manager.login_view = 'auth.login'
     
-    from app.models import User
+    from app.utils.principal import load_principal
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
\ No newline at end of file
+        # Cached principal, so authenticated requests skip the users table
+        return load_principal(int(user_id))
\ No newline at end of file
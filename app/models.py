@@ -1,9 +1,10 @@
 # app/models.py
 from app.extensions import db
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.password_hashing import hash_password, verify_password, needs_rehash
 from datetime import datetime
 import enum
+import json
 
 
 # Define role enum
@@ -23,10 +24,13 @@ class User(db.Model, UserMixin):
     scores = db.relationship('Score', backref='user', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+    
+    def password_needs_upgrade(self):
+        return needs_rehash(self.password_hash)
     
     def to_dict(self):
         return {
@@ -45,6 +49,7 @@ class Subject(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
+    deleted_at = db.Column(db.DateTime, nullable=True, index=True)  # Soft delete, purged later
     chapters = db.relationship('Chapter', backref='subject', lazy=True)
     
     def to_dict(self):
@@ -61,7 +66,8 @@ class Chapter(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False, index=True)
+    deleted_at = db.Column(db.DateTime, nullable=True, index=True)
     quizzes = db.relationship('Quiz', backref='chapter', lazy=True)
     
     def to_dict(self):
@@ -78,11 +84,12 @@ class Chapter(db.Model):
 
 class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=False)
-    date_of_quiz = db.Column(db.Date, nullable=False)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=False, index=True)
+    date_of_quiz = db.Column(db.Date, nullable=False, index=True)
     end_date = db.Column(db.Date, nullable=True)  # Add end date field
     time_duration = db.Column(db.String(5), nullable=False)  # Format: HH:MM
     remarks = db.Column(db.Text, nullable=True)
+    deleted_at = db.Column(db.DateTime, nullable=True, index=True)
     questions = db.relationship('Question', backref='quiz', lazy=True)
     scores = db.relationship('Score', backref='quiz', lazy=True)
     
@@ -102,7 +109,7 @@ class Quiz(db.Model):
 
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
     question_statement = db.Column(db.Text, nullable=False)
     option1 = db.Column(db.String(255), nullable=False)
     option2 = db.Column(db.String(255), nullable=False)
@@ -131,10 +138,15 @@ class Question(db.Model):
 
 
 class Score(db.Model):
+    __table_args__ = (
+        # Per-user history and date-bounded per-user lookups
+        db.Index('ix_score_user_id_time_stamp', 'user_id', 'time_stamp_of_attempt'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    time_stamp_of_attempt = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    time_stamp_of_attempt = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     total_scored = db.Column(db.Integer, nullable=False)
     max_score = db.Column(db.Integer, nullable=False)
     
@@ -148,7 +160,65 @@ class Score(db.Model):
             'max_score': self.max_score
         }
 
+
+
+
+class UserSubjectStat(db.Model):
+    # Incremental per-user, per-subject rollup maintained on quiz submission
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    total_correct = db.Column(db.Integer, nullable=False, default=0)
+    total_questions = db.Column(db.Integer, nullable=False, default=0)
     
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'subject_id': self.subject_id,
+            'attempts': self.attempts,
+            'total_correct': self.total_correct,
+            'total_questions': self.total_questions
+        }
+
+
+
+
+class SpoolBatch(db.Model):
+    # Score spool files already written, so a file replayed after a crash is not inserted twice
+    digest = db.Column(db.String(64), primary_key=True)  # SHA-256 of the file contents
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+
+
+class MonthlyUserReport(db.Model):
+    # Per-user monthly aggregates written by the monthly report job
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True, index=True)  # First day of the month
+    attempts = db.Column(db.Integer, nullable=False)
+    total_correct = db.Column(db.Integer, nullable=False)
+    total_questions = db.Column(db.Integer, nullable=False)
+    avg_score = db.Column(db.Float, nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    subject_stats = db.Column(db.Text, nullable=False)  # JSON list of per-subject stats
+    chart_series = db.Column(db.Text, nullable=False)  # JSON [dates, percentages]
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'month': self.month.isoformat(),
+            'attempts': self.attempts,
+            'total_correct': self.total_correct,
+            'total_questions': self.total_questions,
+            'avg_score': self.avg_score,
+            'rank': self.rank,
+            'subject_stats': json.loads(self.subject_stats),
+            'chart_series': json.loads(self.chart_series)
+        }
+
+
+
 
 class ExportJob(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -174,20 +244,30 @@ class ExportJob(db.Model):
 
 
 class ExportRequest(db.Model):
+    __table_args__ = (
+        db.Index('ix_export_request_user_id_created_at', 'user_id', 'created_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     task_id = db.Column(db.String(36), nullable=False)
+    kind = db.Column(db.String(20), nullable=False, default='user', server_default='user')  # user, cohort
     file_name = db.Column(db.String(255), nullable=True)
-    status = db.Column(db.String(20), default='pending')  # pending, completed, failed
+    status = db.Column(db.String(20), default='pending')  # pending, processing, completed, failed
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime, nullable=True)
+    progress = db.Column(db.Integer, default=0)  # Rows written so far
+    total_rows = db.Column(db.Integer, nullable=True)
     
     def to_dict(self):
         return {
             'id': self.id,
             'task_id': self.task_id,
+            'kind': self.kind,
             'file_name': self.file_name,
             'status': self.status,
+            'progress': self.progress,
+            'total_rows': self.total_rows,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
\ No newline at end of file
@@ -51,8 +51,15 @@ Vue.component('chapter-manager', {
         async fetchChapters() {
             this.loading = true;
             try {
-                const response = await axios.get(`/api/admin/chapters?subject_id=${this.subjectId}`);
-                this.chapters = response.data.chapters;
+                // The list is paginated; follow the cursor to the last page
+                let chapters = [];
+                let afterId = null;
+                do {
+                    const response = await axios.get('/api/admin/chapters', { params: { subject_id: this.subjectId, after_id: afterId || undefined } });
+                    chapters = chapters.concat(response.data.chapters);
+                    afterId = response.data.next_after_id;
+                } while (afterId);
+                this.chapters = chapters;
                 this.error = null;
             } catch (error) {
                 console.error('Error fetching chapters:', error);
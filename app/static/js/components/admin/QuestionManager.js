@@ -64,8 +64,15 @@ Vue.component('question-manager', {
         async fetchQuestions() {
             this.loading = true;
             try {
-                const response = await axios.get(`/api/admin/questions?quiz_id=${this.quizId}`);
-                this.questions = response.data.questions;
+                // The list is paginated; follow the cursor to the last page
+                let questions = [];
+                let afterId = null;
+                do {
+                    const response = await axios.get('/api/admin/questions', { params: { quiz_id: this.quizId, after_id: afterId || undefined } });
+                    questions = questions.concat(response.data.questions);
+                    afterId = response.data.next_after_id;
+                } while (afterId);
+                this.questions = questions;
                 this.error = null;
             } catch (error) {
                 console.error('Error fetching questions:', error);
@@ -59,8 +59,15 @@ Vue.component('quiz-manager', {
         async fetchQuizzes() {
             this.loading = true;
             try {
-                const response = await axios.get(`/api/admin/quizzes?chapter_id=${this.chapterId}`);
-                this.quizzes = response.data.quizzes;
+                // The list is paginated; follow the cursor to the last page
+                let quizzes = [];
+                let afterId = null;
+                do {
+                    const response = await axios.get('/api/admin/quizzes', { params: { chapter_id: this.chapterId, after_id: afterId || undefined } });
+                    quizzes = quizzes.concat(response.data.quizzes);
+                    afterId = response.data.next_after_id;
+                } while (afterId);
+                this.quizzes = quizzes;
                 this.error = null;
             } catch (error) {
                 console.error('Error fetching quizzes:', error);
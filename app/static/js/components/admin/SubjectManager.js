@@ -25,8 +25,15 @@ Vue.component('subject-manager', {
         async fetchSubjects() {
             this.loading = true;
             try {
-                const response = await axios.get('/api/admin/subjects');
-                this.subjects = response.data.subjects;
+                // The list is paginated; follow the cursor to the last page
+                let subjects = [];
+                let afterId = null;
+                do {
+                    const response = await axios.get('/api/admin/subjects', { params: { after_id: afterId || undefined } });
+                    subjects = subjects.concat(response.data.subjects);
+                    afterId = response.data.next_after_id;
+                } while (afterId);
+                this.subjects = subjects;
                 this.error = null;
             } catch (error) {
                 console.error('Error fetching subjects:', error);
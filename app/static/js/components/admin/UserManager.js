@@ -29,8 +29,15 @@ Vue.component('user-manager', {
         async fetchUsers() {
             this.loading = true;
             try {
-                const response = await axios.get('/api/admin/users');
-                this.users = response.data.users;
+                // The list is paginated; follow the cursor to the last page
+                let users = [];
+                let afterId = null;
+                do {
+                    const response = await axios.get('/api/admin/users', { params: { after_id: afterId || undefined } });
+                    users = users.concat(response.data.users);
+                    afterId = response.data.next_after_id;
+                } while (afterId);
+                this.users = users;
                 this.error = null;
             } catch (error) {
                 console.error('Error fetching users:', error);
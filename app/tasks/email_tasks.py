@@ -0,0 +1,102 @@
+# app/tasks/email_tasks.py
+from celery import chord
+from celery_app import celery_app, get_flask_app
+from app.utils.email_utils import send_emails
+from flask import render_template, current_app
+
+
+@celery_app.task(bind=True, max_retries=3)
+def send_templated_emails(self, template, subject, entries, already_sent=0):
+    """Render and send one chunk of emails over a single SMTP connection.
+    
+    Args:
+        template: Template path without extension; both .txt and .html are rendered
+        subject: Email subject line
+        entries: List of {'recipient': address, 'context': template variables}, optionally
+            with 'chart_series': (dates, percentages) rendered into the chart_image variable
+        already_sent: Messages of this chunk delivered by earlier attempts
+    """
+    app = get_flask_app()
+    with app.app_context():
+        chart_images = _chart_images(entries)
+        messages = []
+        for entry in entries:
+            context = entry['context']
+            if id(entry) in chart_images:
+                context = dict(context, chart_image=chart_images[id(entry)])
+            messages.append({
+                'subject': subject,
+                'recipients': [entry['recipient']],
+                'text_body': render_template(f'{template}.txt', **context),
+                'html_body': render_template(f'{template}.html', **context),
+                'entry': entry
+            })
+        
+        try:
+            sent, failed = send_emails(messages)
+        except Exception as e:
+            # Could not even open the SMTP connection
+            print(f"Failed to connect to mail server: {str(e)}")
+            sent, failed = 0, messages
+        
+        sent += already_sent
+        failed_entries = [message['entry'] for message in failed]
+        
+        # Retry only the failed part of the chunk, with exponential backoff
+        if failed_entries and self.request.retries < self.max_retries:
+            backoff = current_app.config.get('EMAIL_RETRY_BACKOFF', 30)
+            raise self.retry(
+                args=[template, subject, failed_entries],
+                kwargs={'already_sent': sent},
+                countdown=backoff * (2 ** self.request.retries)
+            )
+        
+        return {
+            'sent': sent,
+            'failed': len(failed_entries),
+            'failed_recipients': [entry['recipient'] for entry in failed_entries]
+        }
+
+
+def _chart_images(entries):
+    """Base64 PNGs for the entries with a chart_series, by id(entry).
+    
+    Charts are cached by a hash of their series, usually rendered ahead by the sender;
+    anything missing from the cache is rendered here.
+    """
+    with_charts = [entry for entry in entries if entry.get('chart_series')]
+    if not with_charts:
+        return {}
+    from app.tasks.report_tasks import render_charts
+    images = render_charts([entry['chart_series'] for entry in with_charts])
+    return {id(entry): image for entry, image in zip(with_charts, images)}
+
+
+@celery_app.task
+def summarize_email_dispatch(results, label):
+    """Chord callback: aggregate sent/failed counts across all chunks."""
+    sent = sum(result['sent'] for result in results)
+    failed = sum(result['failed'] for result in results)
+    summary = f"{label}: {sent} sent, {failed} failed"
+    print(summary)
+    return {
+        'sent': sent,
+        'failed': failed,
+        'failed_recipients': [recipient for result in results for recipient in result['failed_recipients']]
+    }
+
+
+def dispatch_templated_emails(template, subject, entries, label, chunk_size=None):
+    """Fan entries out to parallel chunk tasks and aggregate their results in a chord.
+    
+    Returns the chord's AsyncResult, or None if there is nothing to send.
+    """
+    if not entries:
+        return None
+    
+    chunk_size = chunk_size or current_app.config.get('EMAIL_CHUNK_SIZE', 100)
+    chunks = [entries[start:start + chunk_size] for start in range(0, len(entries), chunk_size)]
+    
+    return chord(
+        send_templated_emails.s(template, subject, chunk) for chunk in chunks
+    )(summarize_email_dispatch.s(label))
@@ -1,15 +1,38 @@
 import os
 import csv
-from celery_app import celery_app
-from app import create_app
+import gzip
+import tempfile
+from celery_app import celery_app, get_flask_app
 from app.models import User, Quiz, Score, Chapter, Subject, ExportRequest
 from app.extensions import db
-from datetime import datetime
+from datetime import datetime, timedelta
+
+
+# Rows fetched per round trip while streaming exports
+EXPORT_CHUNK_SIZE = 1000
+
+
+def _default_file_mode():
+    # os.umask can only be read by setting it
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# Mode of a file created with open(); mkstemp files start out 0600
+EXPORT_FILE_MODE = _default_file_mode()
+
+
+def _publish(temp_path, file_path):
+    """Give a finished temp file normal permissions and move it into place."""
+    os.chmod(temp_path, EXPORT_FILE_MODE)
+    os.replace(temp_path, file_path)
+
 
 @celery_app.task
 def generate_user_quiz_history_csv(user_id, export_id):
     """Generate CSV export of user's quiz history."""
-    app = create_app()
+    app = get_flask_app()
     with app.app_context():
         # Get user info
         user = User.query.get(user_id)
@@ -18,14 +41,6 @@ def generate_user_quiz_history_csv(user_id, export_id):
         if not user or not export_request:
             return {'status': 'error', 'message': 'User or export request not found'}
             
-        # Get all scores for this user
-        scores = Score.query.filter_by(user_id=user_id).all()
-        
-        if not scores:
-            export_request.status = 'failed'
-            db.session.commit()
-            return {'status': 'error', 'message': 'No quiz history found for this user'}
-            
         # Create a unique filename
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"quiz_history_{user.username}_{timestamp}.csv"
@@ -35,31 +50,55 @@ def generate_user_quiz_history_csv(user_id, export_id):
         os.makedirs(exports_dir, exist_ok=True)
         file_path = os.path.join(exports_dir, filename)
         
-        # Prepare data for CSV
-        data = []
-        for score in scores:
-            quiz = Quiz.query.get(score.quiz_id)
-            chapter = Chapter.query.get(quiz.chapter_id)
-            subject = Subject.query.get(chapter.subject_id)
-            
-            data.append({
-                'Date': score.time_stamp_of_attempt.strftime('%Y-%m-%d %H:%M:%S'),
-                'Subject': subject.name,
-                'Chapter': chapter.name,
-                'Quiz Date': quiz.date_of_quiz.strftime('%Y-%m-%d'),
-                'Score': score.total_scored,
-                'Total Questions': score.max_score,
-                'Percentage': f"{(score.total_scored / score.max_score * 100):.2f}%"
-            })
+        # One joined query, streamed from a server-side cursor in chunks
+        rows = db.session.query(
+            Score.time_stamp_of_attempt,
+            Score.total_scored,
+            Score.max_score,
+            Quiz.date_of_quiz,
+            Chapter.name.label('chapter_name'),
+            Subject.name.label('subject_name')
+        ).join(
+            Quiz, Score.quiz_id == Quiz.id
+        ).join(
+            Chapter, Quiz.chapter_id == Chapter.id
+        ).join(
+            Subject, Chapter.subject_id == Subject.id
+        ).filter(Score.user_id == user_id).order_by(Score.id).yield_per(EXPORT_CHUNK_SIZE)
+        
+        # Write to a temp name in the same directory and rename once complete,
+        # so a half-written file is never served
+        count = 0
+        fd, temp_path = tempfile.mkstemp(dir=exports_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', newline='') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(['Date', 'Subject', 'Chapter', 'Quiz Date', 'Score', 'Total Questions', 'Percentage'])
+                
+                for row in rows:
+                    percentage = (row.total_scored / row.max_score * 100) if row.max_score else 0
+                    writer.writerow([
+                        row.time_stamp_of_attempt.strftime('%Y-%m-%d %H:%M:%S'),
+                        row.subject_name,
+                        row.chapter_name,
+                        row.date_of_quiz.strftime('%Y-%m-%d'),
+                        row.total_scored,
+                        row.max_score,
+                        f"{percentage:.2f}%"
+                    ])
+                    count += 1
             
-        # Write CSV file
-        with open(file_path, 'w', newline='') as csvfile:
-            fieldnames = ['Date', 'Subject', 'Chapter', 'Quiz Date', 'Score', 'Total Questions', 'Percentage']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            if not count:
+                os.remove(temp_path)
+                export_request.status = 'failed'
+                db.session.commit()
+                return {'status': 'error', 'message': 'No quiz history found for this user'}
             
-            writer.writeheader()
-            for row in data:
-                writer.writerow(row)
+            _publish(temp_path, file_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
                 
         # Update export request status
         export_request.status = 'completed'
@@ -73,5 +112,121 @@ def generate_user_quiz_history_csv(user_id, export_id):
             'file_path': file_path,
             'filename': filename,
             'export_id': export_id,
-            'count': len(data)
+            'count': count
+        }
+
+
+@celery_app.task
+def generate_cohort_quiz_history_csv(export_id, subject_id=None, start_date=None, end_date=None):
+    """Generate a gzip-compressed CSV of every user's quiz history in one pass.
+    
+    Args:
+        export_id: ExportRequest that receives progress updates
+        subject_id: If provided, only include attempts on this subject's quizzes
+        start_date, end_date: Optional inclusive 'YYYY-MM-DD' bounds on the attempt date
+    """
+    app = get_flask_app()
+    with app.app_context():
+        export_request = ExportRequest.query.get(export_id)
+        if not export_request:
+            return {'status': 'error', 'message': 'Export request not found'}
+        
+        query = db.session.query(
+            Score.id,
+            User.username,
+            User.full_name,
+            Score.time_stamp_of_attempt,
+            Score.total_scored,
+            Score.max_score,
+            Quiz.date_of_quiz,
+            Chapter.name.label('chapter_name'),
+            Subject.name.label('subject_name')
+        ).join(
+            User, Score.user_id == User.id
+        ).join(
+            Quiz, Score.quiz_id == Quiz.id
+        ).join(
+            Chapter, Quiz.chapter_id == Chapter.id
+        ).join(
+            Subject, Chapter.subject_id == Subject.id
+        )
+        
+        if subject_id:
+            query = query.filter(Subject.id == subject_id)
+        if start_date:
+            query = query.filter(Score.time_stamp_of_attempt >= datetime.strptime(start_date, '%Y-%m-%d'))
+        if end_date:
+            end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+            query = query.filter(Score.time_stamp_of_attempt < end)
+        
+        export_request.status = 'processing'
+        export_request.progress = 0
+        export_request.total_rows = query.count()
+        db.session.commit()
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"quiz_history_all_{timestamp}.csv.gz"
+        exports_dir = os.path.join(app.static_folder, 'exports')
+        os.makedirs(exports_dir, exist_ok=True)
+        file_path = os.path.join(exports_dir, filename)
+        
+        # Walk the history in keyset-paginated chunks of Score.id: each chunk is a short
+        # index range read, so progress can be committed between chunks without
+        # holding a cursor open across transactions
+        count = 0
+        last_id = 0
+        fd, temp_path = tempfile.mkstemp(dir=exports_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            with gzip.open(temp_path, 'wt', newline='') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(['User', 'Full Name', 'Date', 'Subject', 'Chapter', 'Quiz Date',
+                                 'Score', 'Total Questions', 'Percentage'])
+                
+                while True:
+                    chunk = query.filter(Score.id > last_id).order_by(Score.id).limit(EXPORT_CHUNK_SIZE).all()
+                    if not chunk:
+                        break
+                    
+                    for row in chunk:
+                        percentage = (row.total_scored / row.max_score * 100) if row.max_score else 0
+                        writer.writerow([
+                            row.username,
+                            row.full_name,
+                            row.time_stamp_of_attempt.strftime('%Y-%m-%d %H:%M:%S'),
+                            row.subject_name,
+                            row.chapter_name,
+                            row.date_of_quiz.strftime('%Y-%m-%d'),
+                            row.total_scored,
+                            row.max_score,
+                            f"{percentage:.2f}%"
+                        ])
+                    
+                    count += len(chunk)
+                    last_id = chunk[-1].id
+                    export_request.progress = count
+                    db.session.commit()
+            
+            _publish(temp_path, file_path)
+        except Exception as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            db.session.rollback()
+            export_request.status = 'failed'
+            db.session.commit()
+            print(f"Cohort export {export_id} failed: {str(e)}")
+            raise
+        
+        export_request.status = 'completed'
+        export_request.file_name = filename
+        export_request.progress = count
+        export_request.completed_at = datetime.utcnow()
+        db.session.commit()
+        
+        return {
+            'status': 'success',
+            'file_path': file_path,
+            'filename': filename,
+            'export_id': export_id,
+            'count': count
         }
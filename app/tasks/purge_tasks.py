@@ -0,0 +1,42 @@
+# app/tasks/purge_tasks.py
+from celery_app import celery_app, get_flask_app
+from app.models import Subject, Chapter, Quiz
+from app.extensions import db
+from app.utils.catalog_delete import hard_delete
+from app.utils.cache import bump_generation
+from app.utils.answer_keys import bump_quiz_version
+from datetime import datetime, timedelta
+
+
+@celery_app.task
+def purge_deleted_catalog(retention_days=None):
+    """Hard-delete subjects, chapters and quizzes soft-deleted more than retention_days ago."""
+    app = get_flask_app()
+    with app.app_context():
+        if retention_days is None:
+            retention_days = app.config.get('SOFT_DELETE_RETENTION_DAYS', 30)
+        chunk_size = app.config.get('PURGE_CHUNK_SIZE', 10000)
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        
+        purged = {}
+        purged_quizzes = []
+        # Parents first: their cascade also takes the children stamped with them
+        for entity, model in (('subject', Subject), ('chapter', Chapter), ('quiz', Quiz)):
+            ids = db.session.execute(
+                db.select(model.id).where(model.deleted_at.isnot(None), model.deleted_at < cutoff),
+                execution_options={'include_deleted': True}
+            ).scalars().all()
+            purged[entity] = len(ids)
+            for row_id in ids:
+                # One row at a time so each commit covers a bounded amount of work
+                purged_quizzes.extend(hard_delete(entity, [row_id], chunk_size=chunk_size))
+        
+        if any(purged.values()):
+            bump_generation('catalog', 'questions')
+            for quiz_id in purged_quizzes:
+                bump_quiz_version(quiz_id)
+        
+        result = (f"Purged {purged['subject']} subjects, {purged['chapter']} chapters "
+                  f"and {purged['quiz']} quizzes deleted before {cutoff:%Y-%m-%d}")
+        print(result)
+        return result
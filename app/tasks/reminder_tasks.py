@@ -1,85 +1,113 @@
 # app/tasks/reminder_tasks.py
-from celery_app import celery_app
-from app import create_app
+from celery_app import celery_app, get_flask_app
 from app.models import User, Quiz, Score, Subject, Chapter, Role
-from app.utils.email_utils import send_email
-from flask import render_template
+from app.extensions import db
+from app.tasks.email_tasks import dispatch_templated_emails
 from datetime import datetime, timedelta
 from sqlalchemy import func
 
+def plan_daily_reminders(today=None):
+    """Work out who gets a reminder and what it says, using a fixed number of grouped queries.
+    
+    Returns a list of {'user', 'message_type', 'quizzes'} entries, all JSON-serializable.
+    """
+    today = today or datetime.now().date()
+    recent_date = today - timedelta(days=7)
+    recent_start = datetime.combine(recent_date, datetime.min.time())
+    
+    # Get recent quizzes (created in the last 7 days) with their chapter/subject names
+    recent_quizzes = db.session.query(
+        Quiz.id,
+        Quiz.date_of_quiz,
+        Chapter.name,
+        Subject.name
+    ).join(
+        Chapter, Quiz.chapter_id == Chapter.id
+    ).join(
+        Subject, Chapter.subject_id == Subject.id
+    ).filter(Quiz.date_of_quiz >= recent_date).order_by(Quiz.id).all()
+    
+    new_quiz_data = [{
+        'quiz_id': quiz_id,
+        'quiz_date': quiz_date.isoformat(),
+        'chapter_name': chapter_name,
+        'subject_name': subject_name
+    } for quiz_id, quiz_date, chapter_name, subject_name in recent_quizzes]
+    
+    # Every regular user with their attempt count over the last 7 days
+    user_rows = db.session.query(
+        User.id,
+        User.username,
+        User.full_name,
+        func.count(Score.id)
+    ).outerjoin(
+        Score, (Score.user_id == User.id) & (Score.time_stamp_of_attempt >= recent_start)
+    ).filter(User.role == Role.USER).group_by(User.id, User.username, User.full_name).all()
+    
+    # Anti-join input: which of the recent quizzes each user has already attempted
+    attempted = {}
+    if new_quiz_data:
+        attempted_rows = db.session.query(Score.user_id, Score.quiz_id).filter(
+            Score.quiz_id.in_([quiz['quiz_id'] for quiz in new_quiz_data])
+        ).distinct().all()
+        for user_id, quiz_id in attempted_rows:
+            attempted.setdefault(user_id, set()).add(quiz_id)
+    
+    plan = []
+    for user_id, username, full_name, recent_attempts in user_rows:
+        # Skip users who have been active in the last 7 days and have taken at least 3 quizzes
+        if recent_attempts >= 3:
+            continue
+        
+        # Filter new quizzes that user hasn't attempted yet
+        attempted_quiz_ids = attempted.get(user_id, set())
+        relevant_quizzes = [quiz for quiz in new_quiz_data if quiz['quiz_id'] not in attempted_quiz_ids]
+        
+        # Skip if no relevant quizzes
+        if not relevant_quizzes and recent_attempts > 0:
+            continue
+        
+        # Determine message type
+        if not recent_attempts:
+            message_type = "inactivity"
+        elif relevant_quizzes:
+            message_type = "new_quizzes"
+        else:
+            message_type = "general"
+        
+        plan.append({
+            'user': {'id': user_id, 'username': username, 'full_name': full_name},
+            'message_type': message_type,
+            'quizzes': relevant_quizzes[:5]  # Limit to 5 quizzes
+        })
+    
+    return plan
+
+
 @celery_app.task
 def send_daily_reminders():
     """Send daily reminders to users about new quizzes or reminders to visit."""
     
     # Create a Flask app context
-    app = create_app()
+    app = get_flask_app()
     with app.app_context():
-        # Get all regular users
-        users = User.query.filter_by(role=Role.USER).all()
-        
-        # Get recent quizzes (created in the last 7 days)
-        recent_date = datetime.now().date() - timedelta(days=7)
-        recent_quizzes = Quiz.query.filter(Quiz.date_of_quiz >= recent_date).all()
-        
-        new_quiz_data = []
-        for quiz in recent_quizzes:
-            chapter = Chapter.query.get(quiz.chapter_id)
-            subject = Subject.query.get(chapter.subject_id)
-            new_quiz_data.append({
-                'quiz_id': quiz.id,
-                'quiz_date': quiz.date_of_quiz,
-                'chapter_name': chapter.name,
-                'subject_name': subject.name
-            })
+        plan = plan_daily_reminders()
         
-        today = datetime.now().date()
+        entries = [{
+            'recipient': reminder['user']['username'],
+            'context': {
+                'user': reminder['user'],
+                'quizzes': reminder['quizzes'],
+                'message_type': reminder['message_type']
+            }
+        } for reminder in plan]
         
-        # For each user
-        for user in users:
-            # Check if user has been active recently
-            recent_attempts = Score.query.filter_by(user_id=user.id).filter(
-                func.date(Score.time_stamp_of_attempt) >= today - timedelta(days=7)
-            ).count()
-            
-            # Skip users who have been active in the last 7 days and have taken at least 3 quizzes
-            if recent_attempts >= 3:
-                continue
-            
-            # Get user's recent quiz attempts
-            user_attempts = Score.query.filter_by(user_id=user.id).all()
-            attempted_quiz_ids = [score.quiz_id for score in user_attempts]
-            
-            # Filter new quizzes that user hasn't attempted yet
-            relevant_quizzes = [quiz for quiz in new_quiz_data if quiz['quiz_id'] not in attempted_quiz_ids]
-            
-            # Skip if no relevant quizzes
-            if not relevant_quizzes and recent_attempts > 0:
-                continue
-            
-            # Determine message type
-            if not recent_attempts:
-                message_type = "inactivity"
-            elif relevant_quizzes:
-                message_type = "new_quizzes"
-            else:
-                message_type = "general"
-            
-            # Send email
-            subject = "Quiz Master: Your Daily Quiz Reminder"
-            
-            text_body = render_template('emails/daily_reminder.txt', 
-                                       user=user,
-                                       quizzes=relevant_quizzes[:5],  # Limit to 5 quizzes
-                                       message_type=message_type)
-            html_body = render_template('emails/daily_reminder.html',
-                                       user=user,
-                                       quizzes=relevant_quizzes[:5],
-                                       message_type=message_type)
-            
-            try:
-                send_email(subject, [user.username], text_body, html_body)
-                print(f"Sent reminder email to {user.username}")
-            except Exception as e:
-                print(f"Failed to send email to {user.username}: {str(e)}")
+        # Rendering and sending happen in parallel chunk tasks
+        dispatch_templated_emails(
+            'emails/daily_reminder',
+            "Quiz Master: Your Daily Quiz Reminder",
+            entries,
+            label="Daily reminders"
+        )
         
-        return f"Sent reminder emails to applicable users"
\ No newline at end of file
+        return f"Queued {len(entries)} reminder emails"
\ No newline at end of file
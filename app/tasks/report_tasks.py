@@ -1,22 +1,183 @@
 # app/tasks/report_tasks.py
-from celery_app import celery_app
-from app import create_app
-from app.models import User, Quiz, Score, Subject, Chapter, Role
-from app.utils.email_utils import send_email
-from flask import render_template
+from celery_app import celery_app, get_flask_app
+from app.models import User, Quiz, Score, Subject, Chapter, Role, MonthlyUserReport
+from app.extensions import db
+from app.tasks.email_tasks import dispatch_templated_emails
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, case
+from app.utils.cache import cache
+from flask import current_app
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import groupby
+import os
 import io
+import json
+import multiprocessing
 import base64
+import hashlib
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 
 
+# Rendered charts are keyed by a hash of their data, so they never go stale
+CHART_CACHE_TTL = 7 * 24 * 3600
+
+# Rows streamed per round trip, and inserted per statement, by the monthly rollup
+ROLLUP_CHUNK_SIZE = 1000
+
+# Per-process (figure, canvas, axes) reused across renders
+_chart_template = None
+
+
+def _rows_for_user(groups):
+    """Return take(user_id) -> that user's rows, for (user_id, rows) groups in user_id order.
+    
+    take must be called with ascending user ids; groups for users never asked for are skipped.
+    """
+    groups = iter(groups)
+    current = [next(groups, None)]
+    
+    def take(user_id):
+        while current[0] is not None and current[0][0] < user_id:
+            current[0] = next(groups, None)
+        if current[0] is None or current[0][0] != user_id:
+            return []
+        rows = list(current[0][1])
+        current[0] = next(groups, None)
+        return rows
+    return take
+
+
+def build_monthly_rollup(period_start, period_end, extra_user_ids=None):
+    """Aggregate every user's attempts in [period_start, period_end) into MonthlyUserReport rows.
+    
+    Totals and rank come from one grouped query with a RANK() window, per-subject
+    stats from one grouped join, and chart series from one ordered scan. All three
+    are streamed in user order and merged, so memory does not grow with the month.
+    Users in extra_user_ids get a row even if they are not students, unranked
+    (rank 0). Returns the number of ranked users.
+    """
+    month = period_start.date()
+    in_period = (Score.time_stamp_of_attempt >= period_start) & (Score.time_stamp_of_attempt < period_end)
+    in_report = User.role == Role.USER
+    if extra_user_ids:
+        in_report = in_report | User.id.in_(extra_user_ids)
+    
+    # Per-user totals, students ranked by average score
+    totals = db.session.query(
+        Score.user_id.label('user_id'),
+        case((User.role == Role.USER, 1), else_=0).label('ranked'),
+        func.count(Score.id).label('attempts'),
+        func.sum(Score.total_scored).label('total_correct'),
+        func.sum(Score.max_score).label('total_questions')
+    ).join(
+        User, Score.user_id == User.id
+    ).filter(in_report, in_period).group_by(Score.user_id, User.role).subquery()
+    
+    avg_score = func.coalesce(totals.c.total_correct * 100.0 / func.nullif(totals.c.total_questions, 0), 0)
+    rank = func.rank().over(partition_by=totals.c.ranked, order_by=avg_score.desc())
+    ranked = db.session.query(
+        totals.c.user_id,
+        totals.c.attempts,
+        totals.c.total_correct,
+        totals.c.total_questions,
+        avg_score.label('avg_score'),
+        case((totals.c.ranked == 1, rank), else_=0).label('rank')
+    ).order_by(totals.c.user_id).yield_per(ROLLUP_CHUNK_SIZE)
+    
+    # Per-user, per-subject performance
+    subject_rows = db.session.query(
+        Score.user_id,
+        Subject.name,
+        func.count(Score.id),
+        func.sum(Score.total_scored),
+        func.sum(Score.max_score)
+    ).join(
+        Quiz, Score.quiz_id == Quiz.id
+    ).join(
+        Chapter, Quiz.chapter_id == Chapter.id
+    ).join(
+        Subject, Chapter.subject_id == Subject.id
+    ).filter(in_period).group_by(
+        Score.user_id, Subject.id, Subject.name
+    ).order_by(Score.user_id).yield_per(ROLLUP_CHUNK_SIZE)
+    subjects_for = _rows_for_user(groupby(subject_rows, key=lambda row: row[0]))
+    
+    # Chart series: one scan of the month's attempts, ordered per user
+    series_rows = db.session.query(
+        Score.user_id,
+        Score.time_stamp_of_attempt,
+        Score.total_scored,
+        Score.max_score
+    ).filter(in_period).order_by(Score.user_id, Score.time_stamp_of_attempt).yield_per(ROLLUP_CHUNK_SIZE)
+    attempts_for = _rows_for_user(groupby(series_rows, key=lambda row: row.user_id))
+    
+    MonthlyUserReport.query.filter_by(month=month).delete(synchronize_session=False)
+    ranked_users = 0
+    batch = []
+    for row in ranked:
+        subject_stats = []
+        for _, subject_name, attempts, subject_correct, subject_questions in subjects_for(row.user_id):
+            if subject_questions:
+                percentage = round((subject_correct / subject_questions) * 100, 2)
+            else:
+                percentage = 0
+            subject_stats.append({
+                'subject_name': subject_name,
+                'percentage': percentage,
+                'attempts': attempts
+            })
+        
+        batch.append({
+            'user_id': row.user_id,
+            'month': month,
+            'attempts': row.attempts,
+            'total_correct': row.total_correct,
+            'total_questions': row.total_questions,
+            'avg_score': round(row.avg_score, 2),
+            'rank': row.rank,
+            # Sort by percentage descending
+            'subject_stats': json.dumps(sorted(subject_stats, key=lambda x: x['percentage'], reverse=True)),
+            'chart_series': json.dumps(chart_series(attempts_for(row.user_id)))
+        })
+        if row.rank:
+            ranked_users += 1
+        if len(batch) >= ROLLUP_CHUNK_SIZE:
+            db.session.bulk_insert_mappings(MonthlyUserReport, batch)
+            batch = []
+    
+    if batch:
+        db.session.bulk_insert_mappings(MonthlyUserReport, batch)
+    db.session.commit()
+    
+    return ranked_users
+
+
+def _test_report(user_id, today):
+    """Build an unsaved report from a fake 8/10 attempt, for test mode users without data."""
+    test_quiz = db.session.query(Subject.name).select_from(Quiz).join(
+        Chapter, Quiz.chapter_id == Chapter.id
+    ).join(
+        Subject, Chapter.subject_id == Subject.id
+    ).first()
+    if not test_quiz:
+        return None
+    
+    attempt_time = today - timedelta(days=5)
+    return MonthlyUserReport(
+        user_id=user_id,
+        attempts=1,
+        total_correct=8,
+        total_questions=10,
+        avg_score=80.0,
+        rank=0,
+        subject_stats=json.dumps([{'subject_name': test_quiz[0], 'percentage': 80.0, 'attempts': 1}]),
+        chart_series=json.dumps([[attempt_time.strftime('%m/%d')], [80.0]])
+    )
 
-# app/tasks/report_tasks.py
-# Update the task with better debugging and test mode
 
 @celery_app.task
 def send_monthly_reports(test_mode=False, specific_user_id=None):
@@ -29,260 +190,205 @@ def send_monthly_reports(test_mode=False, specific_user_id=None):
     print("Starting monthly reports task")
     
     # Create a Flask app context
-    app = create_app()
+    app = get_flask_app()
     with app.app_context():
-        # Get users to process
-        if specific_user_id:
-            users = User.query.filter_by(id=specific_user_id).all()
-            print(f"Processing specific user ID: {specific_user_id}")
-        else:
-            users = User.query.filter_by(role=Role.USER).all()
-            print(f"Processing {len(users)} users")
-        
-        # If no users found
-        if not users:
-            print("No users found to process")
-            return "No users found"
-        
         # Get the previous month's date range
         today = datetime.now()
         
         if test_mode:
             # For test mode, use current month instead of previous month
             first_day_of_period = datetime(today.year, today.month, 1)
-            last_day_of_period = today
+            end_of_period = today
             month_name = today.strftime("%B %Y") + " (TEST)"
             print(f"Using TEST MODE with current month: {month_name}")
         else:
             # Normal mode - use previous month
-            first_day_of_current_month = datetime(today.year, today.month, 1)
-            last_day_of_previous_month = first_day_of_current_month - timedelta(days=1)
+            end_of_period = datetime(today.year, today.month, 1)
+            last_day_of_previous_month = end_of_period - timedelta(days=1)
             first_day_of_period = datetime(last_day_of_previous_month.year, 
                                          last_day_of_previous_month.month, 1)
-            last_day_of_period = last_day_of_previous_month
             month_name = first_day_of_period.strftime("%B %Y")
             print(f"Using previous month: {month_name}")
         
+        # Aggregate the whole month once; the email step below only reads the rollup
+        ranked_users = build_monthly_rollup(first_day_of_period, end_of_period,
+                                            extra_user_ids=[specific_user_id] if specific_user_id else None)
+        print(f"Aggregated monthly stats for {ranked_users} active users")
+        
+        # Get users to process, with their rollup row if they were active
+        month = first_day_of_period.date()
+        users_query = db.session.query(User, MonthlyUserReport).outerjoin(
+            MonthlyUserReport,
+            (MonthlyUserReport.user_id == User.id) & (MonthlyUserReport.month == month)
+        )
+        if specific_user_id:
+            users_query = users_query.filter(User.id == specific_user_id)
+            print(f"Processing specific user ID: {specific_user_id}")
+        else:
+            users_query = users_query.filter(User.role == Role.USER)
+        users = users_query.all()
+        
+        # If no users found
+        if not users:
+            print("No users found to process")
+            return "No users found"
+        
         # Track results
+        report_entries = []
+        chart_series_list = []
         success_count = 0
         error_count = 0
         skip_count = 0
         
-        # For each user
-        for user in users:
-            print(f"Processing user: {user.username} (ID: {user.id})")
-            
-            # Get user's quiz attempts from the period
-            monthly_scores = Score.query.filter(
-                Score.user_id == user.id,
-                Score.time_stamp_of_attempt >= first_day_of_period,
-                Score.time_stamp_of_attempt <= last_day_of_period
-            ).all()
-            
-            print(f"Found {len(monthly_scores)} scores for user")
-            
+        for user, report in users:
             # Skip users with no activity in the period
-            if not monthly_scores and not test_mode:
-                print(f"Skipping user {user.username} - no activity")
+            if report is None and not test_mode:
+                if specific_user_id:
+                    print(f"User {user.username} has no attempts in {month_name}, no report to send")
                 skip_count += 1
                 continue
             
-            try:
-                # Use test data if no real data found but test_mode is enabled
-                if not monthly_scores and test_mode:
-                    print("Creating test scores data for user")
-                    
-                    # Create fake score data for test mode
-                    fake_scores = []
-                    
-                    # Find a valid quiz in the system
-                    quizzes = Quiz.query.limit(1).all()
-                    if quizzes:
-                        test_quiz = quizzes[0]
-                        
-                        # Create a fake score for test purposes
-                        fake_score = Score(
-                            quiz_id=test_quiz.id,
-                            user_id=user.id,
-                            time_stamp_of_attempt=today - timedelta(days=5),
-                            total_scored=8,
-                            max_score=10
-                        )
-                        
-                        # Don't save to database, just use for report generation
-                        fake_scores.append(fake_score)
-                        print(f"Created test score with quiz ID: {test_quiz.id}")
-                        
-                        monthly_scores = fake_scores
-                
-                # Calculate statistics
-                if monthly_scores:
-                    total_attempts = len(monthly_scores)
-                    total_correct = sum(score.total_scored for score in monthly_scores)
-                    total_questions = sum(score.max_score for score in monthly_scores)
-                    avg_score = round((total_correct / total_questions * 100), 2) if total_questions > 0 else 0
-                    
-                    print(f"User stats: {total_attempts} attempts, {avg_score}% average")
-                    
-                    # Get subject performance data
-                    subject_performance = {}
-                    
-                    for score in monthly_scores:
-                        try:
-                            quiz = Quiz.query.get(score.quiz_id)
-                            if not quiz:
-                                print(f"Warning: Quiz {score.quiz_id} not found")
-                                continue
-                                
-                            chapter = Chapter.query.get(quiz.chapter_id)
-                            if not chapter:
-                                print(f"Warning: Chapter {quiz.chapter_id} not found")
-                                continue
-                                
-                            subject = Subject.query.get(chapter.subject_id)
-                            if not subject:
-                                print(f"Warning: Subject {chapter.subject_id} not found")
-                                continue
-                            
-                            if subject.id not in subject_performance:
-                                subject_performance[subject.id] = {
-                                    'subject_name': subject.name,
-                                    'total_correct': 0,
-                                    'total_questions': 0,
-                                    'attempts': 0
-                                }
-                            
-                            subject_performance[subject.id]['total_correct'] += score.total_scored
-                            subject_performance[subject.id]['total_questions'] += score.max_score
-                            subject_performance[subject.id]['attempts'] += 1
-                        except Exception as e:
-                            print(f"Error processing score {score.id}: {str(e)}")
-                    
-                    # Calculate percentages for each subject
-                    subject_stats = []
-                    for subject_id, data in subject_performance.items():
-                        if data['total_questions'] > 0:
-                            percentage = round((data['total_correct'] / data['total_questions']) * 100, 2)
-                        else:
-                            percentage = 0
-                            
-                        subject_stats.append({
-                            'subject_name': data['subject_name'],
-                            'percentage': percentage,
-                            'attempts': data['attempts']
-                        })
-                    
-                    # Sort by percentage descending
-                    subject_stats.sort(key=lambda x: x['percentage'], reverse=True)
-                    
-                    # Create performance chart image for the email
-                    chart_image = None
-                    try:
-                        chart_image = generate_performance_chart(monthly_scores)
-                        print("Performance chart generated successfully")
-                    except Exception as e:
-                        print(f"Error generating chart: {str(e)}")
-                        import traceback
-                        traceback.print_exc()
-                    
-                    # Send email
-                    subject = f"Your Quiz Master Performance Report - {month_name}"
-                    
-                    text_body = render_template('emails/monthly_report.txt', 
-                                                user=user,
-                                                month=month_name,
-                                                total_attempts=total_attempts,
-                                                avg_score=avg_score,
-                                                subject_stats=subject_stats,
-                                                rank=0,
-                                                total_users=len(users))
-                    html_body = render_template('emails/monthly_report.html',
-                                              user=user,
-                                              month=month_name,
-                                              total_attempts=total_attempts,
-                                              avg_score=avg_score,
-                                              subject_stats=subject_stats,
-                                              rank=0,
-                                              total_users=len(users),
-                                              chart_image=chart_image)
-                    
-                    try:
-                        send_email(subject, [user.username], text_body, html_body)
-                        print(f"Successfully sent monthly report to {user.username}")
-                        success_count += 1
-                    except Exception as e:
-                        print(f"Failed to send email to {user.username}: {str(e)}")
-                        import traceback
-                        traceback.print_exc()
-                        error_count += 1
-            except Exception as e:
-                print(f"Error generating report for user {user.username}: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                error_count += 1
+            if report is None:
+                print(f"Creating test report data for user {user.username}")
+                report = _test_report(user.id, today)
+                if report is None:
+                    error_count += 1
+                    continue
+            
+            chart_series_list.append(json.loads(report.chart_series))
+            
+            # Queue the email; rendering and sending happen in parallel chunk tasks
+            report_entries.append({
+                'recipient': user.username,
+                'context': {
+                    'user': {'id': user.id, 'username': user.username, 'full_name': user.full_name},
+                    'month': month_name,
+                    'total_attempts': report.attempts,
+                    'avg_score': report.avg_score,
+                    'subject_stats': json.loads(report.subject_stats),
+                    'rank': report.rank,
+                    'total_users': ranked_users
+                },
+                # The mail task looks the PNG up by this series' hash, so messages stay small
+                'chart_series': chart_series_list[-1]
+            })
+            success_count += 1
         
-        result = f"Monthly reports: {success_count} sent, {error_count} errors, {skip_count} skipped"
+        # Render every chart across a process pool into the chart cache
+        chart_images = render_charts(chart_series_list)
+        print(f"Rendered {sum(1 for image in chart_images if image)} performance charts")
+        
+        dispatch_templated_emails(
+            'emails/monthly_report',
+            f"Your Quiz Master Performance Report - {month_name}",
+            report_entries,
+            label="Monthly reports"
+        )
+        
+        result = f"Monthly reports: {success_count} queued, {error_count} errors, {skip_count} skipped"
         print(result)
         return result
-    
 
 
-    
+def chart_series(scores):
+    """Return the (dates, percentages) series plotted for a list of scores."""
+    sorted_scores = sorted(scores, key=lambda x: x.time_stamp_of_attempt)
+    dates = [score.time_stamp_of_attempt.strftime('%m/%d') for score in sorted_scores]
+    percentages = [round(score.total_scored / score.max_score * 100, 2) if score.max_score else 0
+                   for score in sorted_scores]
+    return dates, percentages
 
-def generate_performance_chart(scores):
-    """Generate a chart image for the monthly report."""
-    import matplotlib
-    matplotlib.use('Agg')  # Force non-interactive backend
-    import matplotlib.pyplot as plt
-    from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-    import io
-    import base64
+
+def _get_chart_template():
+    """Build this process's figure, canvas and axes once and reuse them for every chart."""
+    global _chart_template
+    if _chart_template is None:
+        fig = Figure(figsize=(8, 4))
+        canvas = FigureCanvas(fig)
+        ax = fig.add_subplot(111)
+        _chart_template = (fig, canvas, ax)
+    return _chart_template
+
+
+def render_performance_chart(dates, percentages):
+    """Render a chart image for the monthly report as a base64 PNG."""
+    if not dates:
+        return None
+    
+    fig, canvas, ax = _get_chart_template()
+    ax.clear()
     
-    print(f"Generating chart for {len(scores)} scores")
+    # Plot against positions so no category state carries over between charts
+    positions = list(range(len(dates)))
+    if len(dates) == 1:
+        # For single data point, create a bar chart
+        ax.bar(positions, percentages, color='royalblue')
+    else:
+        # For multiple points, create a line chart
+        ax.plot(positions, percentages, 'o-', color='royalblue')
     
+    ax.set_xticks(positions)
+    ax.set_xticklabels(dates)
+    ax.set_ylim(0, 100)
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Score (%)')
+    ax.set_title('Quiz Performance')
+    ax.grid(True, linestyle='--', alpha=0.7)
+    
+    # Convert plot to image
+    img_bytes = io.BytesIO()
+    canvas.print_png(img_bytes)
+    return base64.b64encode(img_bytes.getvalue()).decode('utf8')
+
+
+def _render_series(series):
     try:
-        # Sort scores by date
-        sorted_scores = sorted(scores, key=lambda x: x.time_stamp_of_attempt)
-        
-        if not sorted_scores:
-            print("No scores available for chart")
-            return None
-        
-        # Create a very simple chart for testing
-        fig, ax = plt.subplots(figsize=(8, 4))
-        
-        # Plot a basic bar chart
-        dates = [score.time_stamp_of_attempt.strftime('%m/%d') for score in sorted_scores]
-        percentages = [(score.total_scored / score.max_score * 100) for score in sorted_scores]
-        
-        print(f"Chart data - dates: {dates}, percentages: {percentages}")
-        
-        if len(dates) == 1:
-            # For single data point, create a bar chart
-            ax.bar(dates, percentages, color='royalblue')
-        else:
-            # For multiple points, create a line chart
-            ax.plot(dates, percentages, 'o-', color='royalblue')
-        
-        ax.set_ylim(0, 100)
-        ax.set_xlabel('Date')
-        ax.set_ylabel('Score (%)')
-        ax.set_title('Quiz Performance')
-        ax.grid(True, linestyle='--', alpha=0.7)
-        
-        # Convert plot to image
-        img_bytes = io.BytesIO()
-        FigureCanvas(fig).print_png(img_bytes)
-        plt.close(fig)
-        
-        img_bytes.seek(0)
-        plot_url = base64.b64encode(img_bytes.getvalue()).decode('utf8')
-        
-        print("Chart generation successful")
-        return plot_url
-        
+        return render_performance_chart(*series)
     except Exception as e:
         print(f"Error in chart generation: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return None
\ No newline at end of file
+        return None
+
+
+def _render_in_pool(series_list):
+    workers = current_app.config.get('CHART_RENDER_WORKERS') or os.cpu_count() or 1
+    if workers > 1 and len(series_list) > 1:
+        try:
+            # spawn: forking a process with running threads (Celery, the cache listener)
+            # can copy locks held by other threads into the children
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                chunksize = max(1, len(series_list) // (workers * 4))
+                return list(pool.map(_render_series, series_list, chunksize=chunksize))
+        except (AssertionError, OSError, BrokenProcessPool) as e:
+            # Daemonic (prefork) Celery workers cannot start child processes
+            print(f"Chart process pool unavailable, rendering serially: {str(e)}")
+    return [_render_series(series) for series in series_list]
+
+
+def render_charts(series_list):
+    """Render many (dates, percentages) series, reusing cached PNGs keyed by content hash."""
+    keys = [
+        "chart_" + hashlib.sha256(json.dumps(series).encode('utf-8')).hexdigest()
+        for series in series_list
+    ]
+    images = dict(zip(keys, cache.get_many(*keys))) if keys else {}
+    
+    # Identical series share one render
+    missing = {}
+    for key, series in zip(keys, series_list):
+        if images.get(key) is None:
+            missing[key] = series
+    
+    if missing:
+        rendered = _render_in_pool(list(missing.values()))
+        for key, image in zip(missing, rendered):
+            images[key] = image
+            if image:
+                cache.set(key, image, timeout=CHART_CACHE_TTL)
+    
+    return [images.get(key) for key in keys]
+
+
+def generate_performance_chart(scores):
+    """Generate a chart image for the monthly report."""
+    return render_performance_chart(*chart_series(scores))
@@ -0,0 +1,47 @@
+# app/utils/answer_keys.py
+from array import array
+from app.extensions import db
+from app.models import Question
+from app.utils.cache import get_generation, bump_generation
+
+
+# quiz_id -> (version, question ids, correct options), local to this process
+_answer_keys = {}
+
+
+def get_quiz_version(quiz_id, seed=True):
+    """Return the shared content version token for a quiz (None if unseeded and not seed)."""
+    return get_generation(f"quiz_{quiz_id}", seed=seed)
+
+
+def bump_quiz_version(quiz_id):
+    """Invalidate everything derived from a quiz's questions, in every worker."""
+    if quiz_id is not None:
+        bump_generation(f"quiz_{quiz_id}")
+
+
+def get_answer_key(quiz_id):
+    """Return (question_ids, correct_options) arrays for a quiz, loading them on version change."""
+    version = get_quiz_version(quiz_id)
+    entry = _answer_keys.get(quiz_id)
+    if entry is not None and entry[0] == version:
+        return entry[1], entry[2]
+    
+    rows = db.session.query(Question.id, Question.correct_option).filter_by(
+        quiz_id=quiz_id
+    ).order_by(Question.id).all()
+    
+    question_ids = array('l', (question_id for question_id, _ in rows))
+    correct_options = array('b', (correct_option for _, correct_option in rows))
+    _answer_keys[quiz_id] = (version, question_ids, correct_options)
+    return question_ids, correct_options
+
+
+def grade_answers(quiz_id, answers):
+    """Return (correct_answers, total_questions) for submitted {question_id: option} answers."""
+    question_ids, correct_options = get_answer_key(quiz_id)
+    correct_answers = 0
+    for question_id, correct_option in zip(question_ids, correct_options):
+        if answers.get(str(question_id)) == correct_option:
+            correct_answers += 1
+    return correct_answers, len(question_ids)
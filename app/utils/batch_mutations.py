@@ -0,0 +1,204 @@
+# app/utils/batch_mutations.py
+# Ordered create/update/delete operations on subjects, chapters and quizzes, applied in
+# one transaction. Consecutive operations of the same kind run as one bulk statement
+# (multi-row INSERT ... RETURNING, executemany UPDATE by primary key, DELETE ... IN).
+#
+# Operation format:
+#   {"op": "create", "entity": "chapter", "ref": "c1", "data": {"name": "...", "subject_id": "$s1"}}
+#   {"op": "update", "entity": "quiz", "id": 7, "data": {"remarks": "..."}}
+#   {"op": "delete", "entity": "subject", "id": 3}
+# A create with a "ref" can be referred to as "$<ref>" in later *_id fields.
+from datetime import datetime
+from itertools import groupby
+from app.extensions import db
+from app.models import Subject, Chapter, Quiz
+from app.utils.catalog_delete import delete_catalog
+
+
+MAX_BATCH_OPERATIONS = 5000
+
+
+class BatchError(Exception):
+    """An operation is invalid; nothing in the batch is applied."""
+
+    def __init__(self, index, message):
+        super().__init__(message)
+        self.index = index
+        self.message = message
+
+
+def _parse_str(value):
+    if not isinstance(value, str):
+        raise TypeError('expected a string')
+    return value
+
+
+def _parse_int(value):
+    # bool is an int subclass; floats only when they are whole numbers
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise TypeError('expected an integer')
+    return value
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    return datetime.strptime(_parse_str(value), '%Y-%m-%d').date()
+
+
+# Per entity: model, writable fields with their parsers, fields required on create,
+# and parent foreign key
+ENTITIES = {
+    'subject': {
+        'model': Subject,
+        'fields': {'name': _parse_str, 'description': _parse_str},
+        'required': ('name',),
+        'parent': None
+    },
+    'chapter': {
+        'model': Chapter,
+        'fields': {'name': _parse_str, 'description': _parse_str, 'subject_id': _parse_int},
+        'required': ('name', 'subject_id'),
+        'parent': ('subject_id', Subject)
+    },
+    'quiz': {
+        'model': Quiz,
+        'fields': {'chapter_id': _parse_int, 'date_of_quiz': _parse_date, 'end_date': _parse_date,
+                   'time_duration': _parse_str, 'remarks': _parse_str},
+        'required': ('chapter_id', 'date_of_quiz', 'time_duration'),
+        'parent': ('chapter_id', Chapter)
+    }
+}
+
+
+def _validate_shape(index, operation):
+    if not isinstance(operation, dict):
+        raise BatchError(index, 'operation must be an object')
+    if operation.get('op') not in ('create', 'update', 'delete'):
+        raise BatchError(index, 'op must be create, update or delete')
+    if operation.get('entity') not in ENTITIES:
+        raise BatchError(index, f"entity must be one of {', '.join(ENTITIES)}")
+    row_id = operation.get('id')
+    if operation['op'] != 'create' and not (_is_id(row_id) or _is_ref(row_id)):
+        raise BatchError(index, 'id is required')
+    if operation['op'] != 'delete' and not isinstance(operation.get('data'), dict):
+        raise BatchError(index, 'data is required')
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_ref(value):
+    return isinstance(value, str) and value.startswith('$')
+
+
+def _resolve(index, value, refs):
+    if not _is_ref(value):
+        return value
+    if value[1:] not in refs:
+        raise BatchError(index, f'Unknown reference {value}')
+    return refs[value[1:]]
+
+
+def _values(index, operation, spec, refs):
+    """Parsed column values of a create/update, with $refs resolved."""
+    data = operation['data']
+    unknown = [name for name in data if name not in spec['fields']]
+    if unknown:
+        raise BatchError(index, f"Unknown fields: {', '.join(unknown)}")
+
+    values = {}
+    for name, value in data.items():
+        if name.endswith('_id'):
+            value = _resolve(index, value, refs)
+        try:
+            values[name] = spec['fields'][name](value) if value is not None else None
+        except (TypeError, ValueError):
+            raise BatchError(index, f'Invalid value for {name}')
+
+    if operation['op'] == 'create':
+        missing = [name for name in spec['required'] if values.get(name) is None]
+        if missing:
+            raise BatchError(index, f"Missing fields: {', '.join(missing)}")
+    elif any(values.get(name) is None for name in spec['required'] if name in values):
+        raise BatchError(index, 'Required fields cannot be null')
+    return values
+
+
+def _check_exists(run, model, ids, message):
+    """Raise for the first operation in run whose id is not a row of model."""
+    found = {row_id for (row_id,) in db.session.query(model.id).filter(model.id.in_(set(ids)))}
+    for (index, _), row_id in zip(run, ids):
+        if row_id not in found:
+            raise BatchError(index, message.format(id=row_id))
+
+
+def _apply_run(op, entity, run, refs, results, touched_quizzes):
+    spec = ENTITIES[entity]
+    model = spec['model']
+
+    if op != 'create':
+        ids = [_resolve(index, operation['id'], refs) for index, operation in run]
+
+    if op == 'delete':
+        _check_exists(run, model, ids, f'{entity.capitalize()} {{id}} not found')
+        # Cascades to everything underneath, or soft-deletes it
+        touched_quizzes.update(delete_catalog(entity, ids))
+        for (index, _), row_id in zip(run, ids):
+            results[index] = {'op': op, 'entity': entity, 'id': row_id}
+        return
+
+    rows = [_values(index, operation, spec, refs) for index, operation in run]
+
+    if spec['parent']:
+        parent_field, parent_model = spec['parent']
+        with_parent = [(item, values[parent_field]) for item, values in zip(run, rows) if parent_field in values]
+        if with_parent:
+            _check_exists([item for item, _ in with_parent], parent_model,
+                          [parent_id for _, parent_id in with_parent],
+                          f'{parent_model.__name__} {{id}} not found')
+
+    if op == 'create':
+        ids = db.session.execute(
+            db.insert(model).returning(model.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        for (index, operation), row_id in zip(run, ids):
+            if operation.get('ref'):
+                refs[str(operation['ref'])] = row_id
+            results[index] = {'op': op, 'entity': entity, 'id': row_id, 'ref': operation.get('ref')}
+        return
+
+    _check_exists(run, model, ids, f'{entity.capitalize()} {{id}} not found')
+    # ORM bulk UPDATE by primary key: one executemany per distinct set of columns
+    updates = [{**values, 'id': row_id} for values, row_id in zip(rows, ids) if values]
+    if updates:
+        db.session.execute(db.update(model), updates)
+    for (index, _), row_id in zip(run, ids):
+        results[index] = {'op': op, 'entity': entity, 'id': row_id}
+    if entity == 'quiz':
+        touched_quizzes.update(ids)
+
+
+def apply_batch(operations):
+    """Apply operations in order without committing.
+
+    Returns (results, touched_quiz_ids); raises BatchError on the first invalid
+    operation, after which the caller must roll back.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise BatchError(None, 'operations must be a non-empty list')
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise BatchError(None, f'At most {MAX_BATCH_OPERATIONS} operations per batch')
+    for index, operation in enumerate(operations):
+        _validate_shape(index, operation)
+
+    refs = {}
+    results = [None] * len(operations)
+    touched_quizzes = set()
+    runs = groupby(enumerate(operations), key=lambda item: (item[1]['op'], item[1]['entity']))
+    for (op, entity), run in runs:
+        _apply_run(op, entity, list(run), refs, results, touched_quizzes)
+    return results, touched_quizzes
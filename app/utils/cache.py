@@ -1,6 +1,10 @@
 # app/utils/cache.py
 
+import time
+from uuid import uuid4
+from flask import request, g, current_app, has_request_context
 from flask_caching import Cache
+from flask_login import current_user
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
@@ -16,10 +20,12 @@ limiter = Limiter(
 def init_cache(app):
     # Configure cache
     cache_config = {
-        "CACHE_TYPE": "RedisCache",
-        "CACHE_REDIS_HOST": "localhost",
-        "CACHE_REDIS_PORT": 6379,
-        "CACHE_REDIS_DB": 0,
+        # In-process LRU in front of Redis; falls back to in-process only without Redis
+        "CACHE_TYPE": "app.utils.layered_cache.LayeredCache",
+        "CACHE_REDIS_URL": app.config.get("CACHE_REDIS_URL"),
+        "CACHE_LOCAL_MAX_BYTES": app.config.get("CACHE_LOCAL_MAX_BYTES", 64 * 1024 * 1024),
+        "CACHE_LOCAL_MAX_ITEMS": app.config.get("CACHE_LOCAL_MAX_ITEMS", 10000),
+        "CACHE_LOCAL_TIMEOUT": app.config.get("CACHE_LOCAL_TIMEOUT", 30),
         "CACHE_DEFAULT_TIMEOUT": 300,  # 5 minutes
         "CACHE_KEY_PREFIX": "quizmaster_"
     }
@@ -29,9 +35,85 @@ def init_cache(app):
     # Configure rate limiter
     limiter.init_app(app)
 
-def clear_cache_by_pattern(pattern):
-    """Clear all cache keys matching a pattern."""
-    if hasattr(cache, 'cache') and hasattr(cache.cache, '_client'):
-        redis_client = cache.cache._client
-        for key in redis_client.scan_iter(f"*{pattern}*"):
-            redis_client.delete(key)
\ No newline at end of file
+
+# Generation-based invalidation: every tag has a token embedded in the cache keys
+# that depend on it. Bumping the token orphans those keys in O(1); they expire on TTL.
+# Tokens end with the time they were made, so a cache fill can tell whether a read
+# replica may still be behind the generation it is filling.
+
+# Without Redis every worker has its own tokens and bumps stay in the bumping process,
+# so tokens are re-seeded this often to bound how stale other workers can be
+LOCAL_GENERATION_TTL = 5
+
+
+def _generation_key(tag):
+    return f"gen_{tag}"
+
+
+def _new_generation():
+    return f"{uuid4().hex}:{time.time():.3f}"
+
+
+def _generation_time(generation):
+    try:
+        return float(generation.rsplit(':', 1)[1])
+    except (AttributeError, IndexError, ValueError):
+        # Tokens from before timestamps were added are long settled
+        return 0.0
+
+
+def read_primary_if_recent(*generations):
+    """Send this request's replica reads to the primary if any generation is younger than DB_REPLICA_MAX_LAG.
+
+    Called before a cache fill: the replica may not have the writes behind a fresh
+    generation yet, and whatever is filled is served under it until the TTL.
+    """
+    if not has_request_context() or not g.get('db_use_replica'):
+        return
+    max_lag = current_app.config.get('DB_REPLICA_MAX_LAG', 5)
+    now = time.time()
+    if any(now - _generation_time(generation) < max_lag for generation in generations):
+        g.db_use_replica = False
+
+
+def _generation_ttl():
+    return 0 if getattr(cache.cache, 'remote', None) is not None else LOCAL_GENERATION_TTL
+
+
+def get_generation(tag, seed=True):
+    """Return the current generation token for a tag, seeding one if missing (None if not seed)."""
+    key = _generation_key(tag)
+    generation = cache.get(key)
+    if generation is None and seed:
+        # add() keeps concurrent seeders consistent
+        cache.add(key, _new_generation(), timeout=_generation_ttl())
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(*tags):
+    """Invalidate every cached entry built under any of the given tags."""
+    for tag in tags:
+        cache.set(_generation_key(tag), _new_generation(), timeout=_generation_ttl())
+
+
+def tagged_key(*tags):
+    """Build a key_prefix for @cache.cached from the request and the tags' generations.
+
+    Tags may contain {user_id}, which is filled in from current_user.
+    """
+    def make_key():
+        resolved = [tag.format(user_id=current_user.get_id()) for tag in tags]
+        generations = cache.get_many(*[_generation_key(tag) for tag in resolved])
+        
+        parts = [request.path, request.query_string.decode('utf-8')]
+        generations_used = []
+        for tag, generation in zip(resolved, generations):
+            if generation is None:
+                generation = get_generation(tag)
+            parts.append(f"{tag}:{generation}")
+            generations_used.append(generation)
+        # On a miss the view fills this key; make sure it reads data that new
+        read_primary_if_recent(*generations_used)
+        return "|".join(parts)
+    return make_key
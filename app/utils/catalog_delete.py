@@ -0,0 +1,141 @@
+# app/utils/catalog_delete.py
+# Deleting subjects, chapters and quizzes. Hard deletes are set-based DELETE statements
+# over everything underneath (scores, questions, quizzes, chapters), so nothing is loaded
+# into the session. With SOFT_DELETE_ENABLED the rows are only stamped with deleted_at
+# (hidden from every ORM query, along with their questions and scores, once
+# init_soft_delete has run) and purge_deleted_catalog removes them later.
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import with_loader_criteria
+from app.extensions import db
+from app.models import Subject, Chapter, Quiz, Question, Score, UserSubjectStat
+from app.utils.db_routing import RoutingSession
+from app.utils.stats import subtract_score_rollups
+
+
+CATALOG_MODELS = {'subject': Subject, 'chapter': Chapter, 'quiz': Quiz}
+
+
+def _hide_soft_deleted(execute_state):
+    # Applies to joins and relationship loads too; opt out with include_deleted=True.
+    # Soft deletes stamp every quiz under a deleted row, so questions and scores only
+    # need to check their quiz
+    if (execute_state.is_select
+            and not execute_state.is_column_load
+            and not execute_state.is_relationship_load
+            and not execute_state.execution_options.get('include_deleted', False)):
+        live_quiz_ids = db.select(Quiz.id).where(Quiz.deleted_at.is_(None))
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(Subject, Subject.deleted_at.is_(None), include_aliases=True),
+            with_loader_criteria(Chapter, Chapter.deleted_at.is_(None), include_aliases=True),
+            with_loader_criteria(Quiz, Quiz.deleted_at.is_(None), include_aliases=True),
+            with_loader_criteria(Question, Question.quiz_id.in_(live_quiz_ids), include_aliases=True),
+            with_loader_criteria(Score, Score.quiz_id.in_(live_quiz_ids), include_aliases=True)
+        )
+
+
+def init_soft_delete(app):
+    """Hide soft-deleted rows from ORM queries if SOFT_DELETE_ENABLED; without it nothing is stamped."""
+    registered = event.contains(RoutingSession, 'do_orm_execute', _hide_soft_deleted)
+    if app.config.get('SOFT_DELETE_ENABLED') and not registered:
+        event.listen(RoutingSession, 'do_orm_execute', _hide_soft_deleted)
+    elif not app.config.get('SOFT_DELETE_ENABLED') and registered:
+        event.remove(RoutingSession, 'do_orm_execute', _hide_soft_deleted)
+
+
+def _descendant_ids(entity, ids):
+    """Return (chapter_ids, quiz_ids) under the given rows, soft-deleted ones included."""
+    if entity == 'quiz':
+        return [], list(ids)
+    if entity == 'subject':
+        chapter_ids = db.session.execute(
+            db.select(Chapter.id).where(Chapter.subject_id.in_(ids)),
+            execution_options={'include_deleted': True}
+        ).scalars().all()
+    else:
+        chapter_ids = list(ids)
+    quiz_ids = db.session.execute(
+        db.select(Quiz.id).where(Quiz.chapter_id.in_(chapter_ids)),
+        execution_options={'include_deleted': True}
+    ).scalars().all() if chapter_ids else []
+    return chapter_ids, quiz_ids
+
+
+def _delete_scores(entity, quiz_ids, chunk_size):
+    if not quiz_ids:
+        return
+    # Scores of soft-deleted quizzes already left the rollup; a deleted subject's
+    # rollup rows go with it below
+    live = Quiz.deleted_at.is_(None)
+    if not chunk_size:
+        if entity != 'subject':
+            subtract_score_rollups(Score.quiz_id.in_(quiz_ids), live)
+        db.session.execute(db.delete(Score).where(Score.quiz_id.in_(quiz_ids)))
+        return
+
+    # Chunked: bounded transactions for very large score tables, committed as we go
+    while True:
+        score_ids = db.session.execute(
+            db.select(Score.id).where(Score.quiz_id.in_(quiz_ids)).limit(chunk_size),
+            execution_options={'include_deleted': True}
+        ).scalars().all()
+        if not score_ids:
+            return
+        if entity != 'subject':
+            subtract_score_rollups(Score.id.in_(score_ids), live)
+        db.session.execute(db.delete(Score).where(Score.id.in_(score_ids)))
+        db.session.commit()
+
+
+def hard_delete(entity, ids, chunk_size=None):
+    """Delete rows of a catalog entity and everything under them. Returns the deleted quiz ids.
+
+    Without chunk_size the caller commits; with it, scores are deleted chunk_size at a
+    time with a commit after each chunk and the rest is committed at the end.
+    """
+    ids = list(ids)
+    chapter_ids, quiz_ids = _descendant_ids(entity, ids)
+
+    _delete_scores(entity, quiz_ids, chunk_size)
+    if quiz_ids:
+        db.session.execute(db.delete(Question).where(Question.quiz_id.in_(quiz_ids)))
+        db.session.execute(db.delete(Quiz).where(Quiz.id.in_(quiz_ids)))
+    if chapter_ids:
+        db.session.execute(db.delete(Chapter).where(Chapter.id.in_(chapter_ids)))
+    if entity == 'subject':
+        db.session.execute(db.delete(UserSubjectStat).where(UserSubjectStat.subject_id.in_(ids)))
+        db.session.execute(db.delete(Subject).where(Subject.id.in_(ids)))
+    if chunk_size:
+        db.session.commit()
+    return quiz_ids
+
+
+def soft_delete(entity, ids):
+    """Stamp rows and everything under them with deleted_at. Returns the affected quiz ids. Caller commits."""
+    ids = list(ids)
+    chapter_ids, quiz_ids = _descendant_ids(entity, ids)
+    now = datetime.utcnow()
+
+    # Hidden scores stop counting now rather than when they are purged
+    if entity == 'subject':
+        db.session.execute(db.delete(UserSubjectStat).where(UserSubjectStat.subject_id.in_(ids)))
+    elif quiz_ids:
+        subtract_score_rollups(Score.quiz_id.in_(quiz_ids), Quiz.deleted_at.is_(None))
+    if quiz_ids:
+        db.session.execute(db.update(Quiz).where(Quiz.id.in_(quiz_ids), Quiz.deleted_at.is_(None))
+                           .values(deleted_at=now))
+    if chapter_ids:
+        db.session.execute(db.update(Chapter).where(Chapter.id.in_(chapter_ids), Chapter.deleted_at.is_(None))
+                           .values(deleted_at=now))
+    if entity == 'subject':
+        db.session.execute(db.update(Subject).where(Subject.id.in_(ids), Subject.deleted_at.is_(None))
+                           .values(deleted_at=now))
+    return quiz_ids
+
+
+def delete_catalog(entity, ids):
+    """Delete subjects, chapters or quizzes the configured way. Returns the affected quiz ids. Caller commits."""
+    if current_app.config.get('SOFT_DELETE_ENABLED'):
+        return soft_delete(entity, ids)
+    return hard_delete(entity, ids)
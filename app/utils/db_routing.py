@@ -0,0 +1,58 @@
+# app/utils/db_routing.py
+# Read-replica routing. Endpoints decorated with @replica_read send their queries to the
+# 'replica' bind (DB_REPLICA_URI); everything else, every flush and anything run outside a
+# request stays on the primary. A client that has just written is pinned to the primary
+# for DB_REPLICA_STICKY_SECONDS so it reads its own writes despite replication lag.
+# Only SELECTs are routed; Core INSERT/UPDATE/DELETE always go to the primary. Cached
+# endpoints fill from the replica only once their generations are older than
+# DB_REPLICA_MAX_LAG (see read_primary_if_recent), so a fill never stores rows the
+# replica has not caught up with under a fresh generation.
+import time
+from functools import wraps
+from flask import g, session, current_app, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+
+REPLICA_BIND = 'replica'
+PRIMARY_UNTIL_KEY = '_db_primary_until'
+
+
+class RoutingSession(Session):
+    """Session that sends reads from replica-marked requests to the replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and getattr(clause, 'is_select', False)
+                and has_request_context() and g.get('db_use_replica')):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def pin_to_primary():
+    """Route this client's replica reads to the primary for the next few seconds."""
+    if not has_request_context():
+        return
+    sticky_seconds = current_app.config.get('DB_REPLICA_STICKY_SECONDS', 5)
+    if sticky_seconds:
+        session[PRIMARY_UNTIL_KEY] = time.time() + sticky_seconds
+
+
+def pinned_to_primary():
+    return has_request_context() and session.get(PRIMARY_UNTIL_KEY, 0) > time.time()
+
+
+def replica_read(f):
+    """Serve a read-only endpoint from the replica unless the client recently wrote."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.db_use_replica = not pinned_to_primary()
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _pin_after_write(db_session, flush_context):
+    # Any write inside a request means this client's next reads must see it
+    pin_to_primary()
@@ -0,0 +1,159 @@
+# app/utils/db_tuning.py
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection, including opening new ones."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_time_total += waited
+                self.wait_time_max = max(self.wait_time_max, waited)
+
+
+def pool_metrics(engine):
+    """Snapshot of an engine's pool for monitoring."""
+    pool = engine.pool
+    metrics = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        metrics.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0)
+        })
+    if isinstance(pool, MeteredQueuePool):
+        with pool._stats_lock:
+            metrics.update({
+                'checkouts': pool.checkouts,
+                'timeouts': pool.timeouts,
+                'wait_time_avg_ms': round(pool.wait_time_total / pool.checkouts * 1000, 3) if pool.checkouts else 0,
+                'wait_time_max_ms': round(pool.wait_time_max * 1000, 3)
+            })
+    return metrics
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def server_engine_options(config):
+    """Engine options for a client/server database (Postgres, MySQL) from the active pool profile.
+
+    Web processes serve many short requests; Celery workers run one task per process
+    and need few connections but tolerate long statements.
+    """
+    profile = config.get('DB_POOL_PROFILES', {}).get(config.get('DB_PROFILE', 'web'), {})
+    options = {
+        'poolclass': MeteredQueuePool,
+        'pool_size': profile.get('pool_size', 5),
+        'max_overflow': profile.get('max_overflow', 10),
+        'pool_timeout': profile.get('pool_timeout', 30),
+        'pool_recycle': profile.get('pool_recycle', -1),
+        'pool_pre_ping': profile.get('pool_pre_ping', True)
+    }
+    statement_timeout = profile.get('statement_timeout')
+    if statement_timeout and make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name() == 'postgresql':
+        # Milliseconds; enforced by the server per statement
+        options['connect_args'] = {'options': f"-c statement_timeout={int(statement_timeout)}"}
+    return options
+
+
+def sqlite_engine_options(config):
+    """Engine options for a file-backed SQLite database shared by request threads.
+
+    Each thread checks a connection out of a small QueuePool; sqlite3's own lock
+    timeout matches busy_timeout so writers wait for each other instead of failing.
+    """
+    return {
+        'poolclass': MeteredQueuePool,
+        'pool_size': config.get('SQLITE_POOL_SIZE', 10),
+        'max_overflow': config.get('SQLITE_MAX_OVERFLOW', 10),
+        'pool_timeout': config.get('SQLITE_POOL_TIMEOUT', 30),
+        'connect_args': {
+            'check_same_thread': False,
+            'timeout': config.get('SQLITE_BUSY_TIMEOUT', 5000) / 1000
+        }
+    }
+
+
+def sqlite_pragmas(config):
+    """The (pragma, value) pairs run on every new SQLite connection."""
+    pragmas = [
+        # WAL lets dashboard reads proceed while a submission is being written
+        ('journal_mode', config.get('SQLITE_JOURNAL_MODE', 'WAL')),
+        # NORMAL is durable across application crashes in WAL mode, and skips an fsync per commit
+        ('synchronous', config.get('SQLITE_SYNCHRONOUS', 'NORMAL')),
+        ('busy_timeout', config.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        ('mmap_size', config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        # Negative values are KiB rather than pages
+        ('cache_size', config.get('SQLITE_CACHE_SIZE', -64000)),
+        ('temp_store', config.get('SQLITE_TEMP_STORE', 'MEMORY'))
+    ]
+    return [(name, value) for name, value in pragmas if value is not None]
+
+
+def engine_options(config, uri):
+    """Tuned engine options for a database URI, or {} for the stock engine."""
+    if not is_sqlite(uri):
+        return server_engine_options(dict(config, SQLALCHEMY_DATABASE_URI=uri))
+    # In-memory databases live in a single StaticPool connection
+    if config.get('SQLITE_TUNING_ENABLED', True) and make_url(uri).database not in (None, '', ':memory:'):
+        return sqlite_engine_options(config)
+    return {}
+
+
+def configure_engine_options(app):
+    """Merge the tuned engine options into SQLALCHEMY_ENGINE_OPTIONS and register the replica bind.
+
+    Must run before db.init_app(). Explicit SQLALCHEMY_ENGINE_OPTIONS take precedence.
+    """
+    options = engine_options(app.config, app.config['SQLALCHEMY_DATABASE_URI'])
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    replica_uri = app.config.get('DB_REPLICA_URI')
+    if replica_uri:
+        from app.utils.db_routing import REPLICA_BIND
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds.setdefault(REPLICA_BIND, {'url': replica_uri, **engine_options(app.config, replica_uri)})
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def apply_sqlite_pragmas(engine, config):
+    """Run the SQLite profile on every connection the engine opens."""
+    if not config.get('SQLITE_TUNING_ENABLED', True) or engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
@@ -8,4 +8,27 @@ def send_email(subject, recipients, text_body, html_body=None):
     msg.body = text_body
     if html_body:
         msg.html = html_body
-    mail.send(msg)
\ No newline at end of file
+    mail.send(msg)
+
+
+def send_emails(messages):
+    """Send many messages over one SMTP connection.
+    
+    messages is a list of dicts with subject, recipients, text_body and html_body.
+    Returns (sent_count, failed_messages).
+    """
+    sent = 0
+    failed = []
+    with mail.connect() as connection:
+        for message in messages:
+            msg = Message(message['subject'], recipients=message['recipients'])
+            msg.body = message['text_body']
+            if message.get('html_body'):
+                msg.html = message['html_body']
+            try:
+                connection.send(msg)
+                sent += 1
+            except Exception as e:
+                print(f"Failed to send email to {', '.join(message['recipients'])}: {str(e)}")
+                failed.append(message)
+    return sent, failed
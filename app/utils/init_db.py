@@ -1,13 +1,14 @@
 # app/utils/init_db.py
 from app import create_app, db
 from app.models import User, Role
+from app.utils.migrations import upgrade_database
 from datetime import datetime
 
 def init_db():
     app = create_app()
     with app.app_context():
-        # Create tables
-        db.create_all()
+        # Create tables and apply migrations
+        upgrade_database()
         
         # Check if admin exists
         admin = User.query.filter_by(role=Role.ADMIN).first()
@@ -0,0 +1,294 @@
+# app/utils/layered_cache.py
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from uuid import uuid4
+from flask_caching.backends.base import BaseCache
+from flask_caching.backends.rediscache import RedisCache
+
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """Thread-safe in-process LRU of pickled values, bounded by item count and total bytes."""
+
+    def __init__(self, max_bytes, max_items):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.current_bytes = 0
+        self._entries = OrderedDict()  # key -> (expires_at or None, blob)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, blob = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._pop(key)
+                return _MISSING
+            self._entries.move_to_end(key)
+            return blob
+
+    def set(self, key, blob, timeout):
+        # Entries bigger than the whole budget are only kept remotely
+        if len(blob) > self.max_bytes:
+            self.delete(key)
+            return
+        expires_at = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (expires_at, blob)
+            self.current_bytes += len(blob)
+            while self._entries and (self.current_bytes > self.max_bytes or len(self._entries) > self.max_items):
+                oldest = next(iter(self._entries))
+                self._pop(oldest)
+
+    def add(self, key, blob, timeout):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                return False
+        self.set(key, blob, timeout)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            return self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.current_bytes -= len(entry[1])
+        return True
+
+
+class LayeredCache(BaseCache):
+    """In-process LRU in front of Redis.
+
+    Writes go to Redis and are announced on a pub/sub channel so other workers drop
+    their local copies. Without Redis the LRU is the whole cache.
+    """
+
+    def __init__(self, remote=None, local_max_bytes=64 * 1024 * 1024, local_max_items=10000,
+                 local_timeout=30, default_timeout=300, ignore_delete_many_errors=False,
+                 channel='quizmaster_invalidate'):
+        super().__init__(default_timeout=default_timeout,
+                         ignore_delete_many_errors=ignore_delete_many_errors)
+        self.remote = remote
+        self.local = LocalLRU(local_max_bytes, local_max_items)
+        self.local_timeout = local_timeout
+        self.channel = channel
+        self._origin = uuid4().hex
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        key_prefix = config.get('CACHE_KEY_PREFIX') or ''
+        remote = None
+        redis_url = config.get('CACHE_REDIS_URL')
+        if redis_url:
+            try:
+                from redis import from_url as redis_from_url
+                client = redis_from_url(redis_url, socket_connect_timeout=1)
+                client.ping()
+                remote = RedisCache(host=client, key_prefix=key_prefix,
+                                    default_timeout=kwargs.get('default_timeout', 300))
+            except Exception as e:
+                print(f"Redis cache unavailable, using in-process cache only: {str(e)}")
+
+        kwargs.update(dict(
+            remote=remote,
+            local_max_bytes=config.get('CACHE_LOCAL_MAX_BYTES', 64 * 1024 * 1024),
+            local_max_items=config.get('CACHE_LOCAL_MAX_ITEMS', 10000),
+            local_timeout=config.get('CACHE_LOCAL_TIMEOUT', 30),
+            channel=f"{key_prefix}invalidate"
+        ))
+        return cls(*args, **kwargs)
+
+    # Local tier helpers
+
+    def _local_ttl(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        if self.remote is None:
+            return timeout
+        # Remote is the source of truth; local copies only live for a short while
+        return min(timeout, self.local_timeout) if timeout else self.local_timeout
+
+    def _store_local(self, key, value, timeout):
+        try:
+            blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        self.local.set(key, blob, self._local_ttl(timeout))
+
+    def _get_local(self, key):
+        blob = self.local.get(key)
+        if blob is _MISSING:
+            return _MISSING
+        return pickle.loads(blob)
+
+    # Cross-worker invalidation
+
+    def _publish(self, key):
+        try:
+            self.remote._write_client.publish(self.channel, f"{self._origin}:{key}")
+        except Exception as e:
+            print(f"Failed to publish cache invalidation: {str(e)}")
+
+    def _ensure_listener(self):
+        # Re-checked per call so forked workers start their own subscriber
+        pid = os.getpid()
+        if self.remote is None or self._listener_pid == pid:
+            return
+        with self._listener_lock:
+            if self._listener_pid == pid:
+                return
+            # Anything inherited from the parent may be stale
+            self.local.clear()
+            threading.Thread(target=self._listen, name='cache-invalidation', daemon=True).start()
+            self._listener_pid = pid
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.remote._read_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    origin, _, key = message['data'].decode('utf-8').partition(':')
+                    if origin == self._origin:
+                        continue
+                    if key == '*':
+                        self.local.clear()
+                    else:
+                        self.local.delete(key)
+            except Exception as e:
+                print(f"Cache invalidation listener disconnected: {str(e)}")
+            # Invalidations may have been missed while disconnected
+            self.local.clear()
+            time.sleep(1)
+
+    # Cache API
+
+    def get(self, key):
+        self._ensure_listener()
+        value = self._get_local(key)
+        if value is not _MISSING:
+            return value
+        if self.remote is None:
+            return None
+        try:
+            value = self.remote.get(key)
+        except Exception as e:
+            print(f"Redis cache get failed: {str(e)}")
+            return None
+        if value is not None:
+            self._store_local(key, value, self.local_timeout)
+        return value
+
+    def get_many(self, *keys):
+        self._ensure_listener()
+        values = [self._get_local(key) for key in keys]
+        missing = [key for key, value in zip(keys, values) if value is _MISSING]
+
+        fetched = {}
+        if missing and self.remote is not None:
+            try:
+                fetched = dict(zip(missing, self.remote.get_many(*missing)))
+            except Exception as e:
+                print(f"Redis cache get_many failed: {str(e)}")
+            for key, value in fetched.items():
+                if value is not None:
+                    self._store_local(key, value, self.local_timeout)
+
+        return [fetched.get(key) if value is _MISSING else value for key, value in zip(keys, values)]
+
+    def set(self, key, value, timeout=None):
+        self._ensure_listener()
+        if self.remote is not None:
+            try:
+                self.remote.set(key, value, timeout)
+                self._publish(key)
+            except Exception as e:
+                print(f"Redis cache set failed: {str(e)}")
+        self._store_local(key, value, timeout)
+        return True
+
+    def add(self, key, value, timeout=None):
+        self._ensure_listener()
+        if self.remote is None:
+            try:
+                blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                return False
+            return self.local.add(key, blob, self._local_ttl(timeout))
+        try:
+            added = self.remote.add(key, value, timeout)
+        except Exception as e:
+            print(f"Redis cache add failed: {str(e)}")
+            return False
+        if added:
+            self._publish(key)
+            self._store_local(key, value, timeout)
+        return added
+
+    def delete(self, key):
+        self._ensure_listener()
+        deleted = self.local.delete(key)
+        if self.remote is not None:
+            try:
+                deleted = self.remote.delete(key)
+                self._publish(key)
+            except Exception as e:
+                print(f"Redis cache delete failed: {str(e)}")
+        return deleted
+
+    def has(self, key):
+        if self._get_local(key) is not _MISSING:
+            return True
+        if self.remote is None:
+            return False
+        try:
+            return self.remote.has(key)
+        except Exception as e:
+            print(f"Redis cache has failed: {str(e)}")
+            return False
+
+    def clear(self):
+        self.local.clear()
+        if self.remote is not None:
+            try:
+                self.remote.clear()
+                self._publish('*')
+            except Exception as e:
+                print(f"Redis cache clear failed: {str(e)}")
+                return False
+        return True
+
+    def inc(self, key, delta=1):
+        if self.remote is None:
+            value = (self.get(key) or 0) + delta
+            self.set(key, value)
+            return value
+        try:
+            value = self.remote.inc(key, delta)
+        except Exception as e:
+            print(f"Redis cache inc failed: {str(e)}")
+            return None
+        self.local.delete(key)
+        self._publish(key)
+        return value
+
+    def dec(self, key, delta=1):
+        return self.inc(key, -delta)
@@ -0,0 +1,115 @@
+# app/utils/migrations.py
+# Versioned schema migrations. New tables come from db.create_all(); each migration
+# brings an existing database up to date and is safe to re-run. Applied versions are
+# recorded in the schema_version table.
+#
+# Usage: python -m app.utils.migrations
+from datetime import timedelta
+from app.extensions import db
+
+
+def _columns(connection, table):
+    return [col['name'] for col in db.inspect(connection).get_columns(table)]
+
+
+def _add_quiz_end_date(connection):
+    if 'end_date' in _columns(connection, 'quiz'):
+        return
+    print("Adding end_date column to Quiz table...")
+    connection.execute(db.text('ALTER TABLE quiz ADD COLUMN end_date DATE'))
+
+    # Existing quizzes stay open for a week
+    from app.models import Quiz
+    rows = connection.execute(db.select(Quiz.id, Quiz.date_of_quiz)).all()
+    for quiz_id, date_of_quiz in rows:
+        if date_of_quiz:
+            connection.execute(
+                db.update(Quiz).where(Quiz.id == quiz_id).values(end_date=date_of_quiz + timedelta(days=7))
+            )
+    print(f"Updated {len(rows)} existing quizzes with default end dates.")
+
+
+def _add_export_progress(connection):
+    columns = _columns(connection, 'export_request')
+    if 'progress' not in columns:
+        print("Adding progress column to ExportRequest table...")
+        connection.execute(db.text('ALTER TABLE export_request ADD COLUMN progress INTEGER DEFAULT 0'))
+    if 'total_rows' not in columns:
+        print("Adding total_rows column to ExportRequest table...")
+        connection.execute(db.text('ALTER TABLE export_request ADD COLUMN total_rows INTEGER'))
+
+
+def _add_hot_path_indexes(connection):
+    # Indexes are declared on the models; create any the database is missing
+    from app.models import Score, Question, Quiz, Chapter, ExportRequest, MonthlyUserReport
+    for model in (Score, Question, Quiz, Chapter, ExportRequest, MonthlyUserReport):
+        existing = _columns(connection, model.__tablename__)
+        for index in model.__table__.indexes:
+            # Indexes on columns added by later migrations are created there
+            if any(column.name not in existing for column in index.columns):
+                continue
+            print(f"Ensuring index {index.name}...")
+            index.create(bind=connection, checkfirst=True)
+
+
+def _add_soft_delete_columns(connection):
+    from app.models import Subject, Chapter, Quiz
+    for model in (Subject, Chapter, Quiz):
+        table = model.__tablename__
+        if 'deleted_at' not in _columns(connection, table):
+            print(f"Adding deleted_at column to {model.__name__} table...")
+            connection.execute(db.text(f'ALTER TABLE {table} ADD COLUMN deleted_at TIMESTAMP'))
+        for index in model.__table__.indexes:
+            if 'deleted_at' in index.columns:
+                print(f"Ensuring index {index.name}...")
+                index.create(bind=connection, checkfirst=True)
+
+
+def _add_export_kind(connection):
+    if 'kind' in _columns(connection, 'export_request'):
+        return
+    print("Adding kind column to ExportRequest table...")
+    connection.execute(db.text("ALTER TABLE export_request ADD COLUMN kind VARCHAR(20) NOT NULL DEFAULT 'user'"))
+    # Finished cohort exports are the gzipped ones; unfinished ones cannot be told apart
+    connection.execute(db.text("UPDATE export_request SET kind = 'cohort' WHERE file_name LIKE '%.csv.gz'"))
+
+
+MIGRATIONS = [
+    (1, 'Add quiz end_date', _add_quiz_end_date),
+    (2, 'Add export progress columns', _add_export_progress),
+    (3, 'Add indexes for hot Score/Question/Quiz filters', _add_hot_path_indexes),
+    (4, 'Add soft-delete columns to Subject/Chapter/Quiz', _add_soft_delete_columns),
+    (5, 'Add export kind', _add_export_kind),
+]
+
+
+def upgrade_database():
+    """Create missing tables, then apply every migration newer than the recorded version."""
+    import app.models  # noqa: F401 -- register all tables with the metadata
+    db.create_all()
+
+    with db.engine.begin() as connection:
+        connection.execute(db.text(
+            'CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)'
+        ))
+        current = connection.execute(db.text('SELECT MAX(version) FROM schema_version')).scalar() or 0
+
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        print(f"Applying migration {version}: {description}")
+        with db.engine.begin() as connection:
+            migrate(connection)
+            connection.execute(db.text('INSERT INTO schema_version (version) VALUES (:version)'),
+                               {'version': version})
+        current = version
+
+    print(f"Database schema is at version {current}.")
+    return current
+
+
+if __name__ == '__main__':
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        upgrade_database()
@@ -0,0 +1,66 @@
+# app/utils/pagination.py
+# Keyset pagination with ?fields= projection for list endpoints. A list endpoint declares
+# its output fields as {name: field(...)}; only the columns behind the requested fields
+# are selected, and pages are walked with ?after_id=<last id>&limit=<n>.
+from app.extensions import db
+
+
+# Page size used when the client sends no ?limit=, and the most it may ask for
+DEFAULT_MAX_PAGE_SIZE = 1000
+
+
+def field(*columns, build=None):
+    """An output field: the columns it reads and how to build its value from a result row.
+
+    Without build, the value is the first column as-is.
+    """
+    if build is None:
+        key = columns[0].key
+        build = lambda row: getattr(row, key)
+    return columns, build
+
+
+def isoformat(column):
+    """Field for a date/datetime column, serialized like the models' to_dict()."""
+    key = column.key
+    return field(column, build=lambda row: getattr(row, key).isoformat() if getattr(row, key) else None)
+
+
+def select_fields(fields, requested):
+    """Field names for a comma-separated ?fields= value; every field when absent."""
+    if not requested:
+        return list(fields)
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def keyset_page(fields, id_column, filters=(), requested_fields=None, after_id=None, limit=None,
+                max_page_size=DEFAULT_MAX_PAGE_SIZE):
+    """Return (items, next_after_id) for one page ordered by id_column.
+
+    next_after_id is None on the last page. Raises ValueError for unknown fields.
+    """
+    names = select_fields(fields, requested_fields)
+
+    columns = [id_column]
+    for name in names:
+        for column in fields[name][0]:
+            if not any(column is selected for selected in columns):
+                columns.append(column)
+
+    query = db.session.query(*columns).filter(*filters).order_by(id_column)
+    if after_id:
+        query = query.filter(id_column > after_id)
+    limit = min(max(limit or max_page_size, 1), max_page_size)
+    rows = query.limit(limit + 1).all()
+
+    next_after_id = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after_id = getattr(rows[-1], id_column.key)
+
+    items = [{name: fields[name][1](row) for name in names} for row in rows]
+    return items, next_after_id
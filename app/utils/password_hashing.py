@@ -0,0 +1,68 @@
+# app/utils/password_hashing.py
+# Password hashing off the request thread. Hashes run on a small per-process thread pool
+# (hashlib's scrypt/PBKDF2 release the GIL, so they run in parallel) and at most
+# PASSWORD_HASH_MAX_PENDING may be queued; past that, callers get HashingBusy instead of
+# piling more CPU-bound work onto the web workers.
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when too many password hashes are already queued."""
+
+
+_executor = None
+_executor_pid = None
+_slots = None
+_lock = threading.Lock()
+_method_prefixes = {}
+
+
+def _config(name, default):
+    return current_app.config.get(name) or default
+
+
+def _get_executor():
+    # Rebuilt after fork: pool threads do not survive into child processes
+    global _executor, _executor_pid, _slots
+    pid = os.getpid()
+    if _executor_pid != pid:
+        with _lock:
+            if _executor_pid != pid:
+                workers = _config('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+                max_pending = _config('PASSWORD_HASH_MAX_PENDING', workers * 8)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+                _slots = threading.BoundedSemaphore(workers + max_pending)
+                _executor_pid = pid
+    return _executor
+
+
+def _run(fn, *args):
+    executor = _get_executor()
+    if not _slots.acquire(timeout=_config('PASSWORD_HASH_QUEUE_TIMEOUT', 0.5)):
+        raise HashingBusy("Too many password checks in progress, try again shortly")
+    try:
+        return executor.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password):
+    """Hash a password with the configured PASSWORD_HASH_METHOD."""
+    return _run(generate_password_hash, password, _config('PASSWORD_HASH_METHOD', 'scrypt'))
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """True if a stored hash was made with a different method or cost than configured."""
+    method = _config('PASSWORD_HASH_METHOD', 'scrypt')
+    if method not in _method_prefixes:
+        # werkzeug fills in default parameters, e.g. 'scrypt' -> 'scrypt:32768:8:1'
+        _method_prefixes[method] = generate_password_hash('', method).split('$', 1)[0]
+    return password_hash.split('$', 1)[0] != _method_prefixes[method]
@@ -0,0 +1,69 @@
+# app/utils/principal.py
+# Cached login principal. Flask-Login reloads the user on every request; instead of a
+# users-table query we serve a small read-only principal from the layered cache (local
+# LRU + Redis). Committed changes to a User drop its entry on every worker.
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from app.extensions import db
+from app.models import User, Role
+from app.utils.cache import cache
+from app.utils.db_routing import RoutingSession
+
+
+PRINCIPAL_TTL = 300
+
+
+class UserPrincipal(UserMixin):
+    """What request handlers need of the logged-in user. Load the User for anything else."""
+
+    def __init__(self, id, username, full_name, role):
+        self.id = id
+        self.username = username
+        self.full_name = full_name
+        self.role = Role(role)
+
+
+def _principal_key(user_id):
+    return f"principal_{user_id}"
+
+
+def load_principal(user_id):
+    """Return the UserPrincipal for a user id, or None if the user no longer exists."""
+    data = cache.get(_principal_key(user_id))
+    if data is None:
+        row = db.session.query(
+            User.id, User.username, User.full_name, User.role
+        ).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        data = {'id': row.id, 'username': row.username, 'full_name': row.full_name, 'role': row.role.value}
+        cache.set(_principal_key(user_id), data, timeout=PRINCIPAL_TTL)
+    return UserPrincipal(**data)
+
+
+def invalidate_principal(*user_ids):
+    for user_id in user_ids:
+        cache.delete(_principal_key(user_id))
+
+
+# Collect changed users during the flush and invalidate once the change is committed,
+# so a concurrent request cannot re-cache the old row in between
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _mark_principal_stale(mapper, connection, target):
+    db_session = object_session(target)
+    if db_session is not None:
+        db_session.info.setdefault('stale_principals', set()).add(target.id)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _invalidate_stale_principals(db_session):
+    stale = db_session.info.pop('stale_principals', None)
+    if stale:
+        invalidate_principal(*stale)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_stale_principals(db_session):
+    db_session.info.pop('stale_principals', None)
@@ -0,0 +1,146 @@
+# app/utils/stats.py
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import Subject, Chapter, Quiz, Score, UserSubjectStat
+
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def get_subject_rollups(user_id):
+    """Return (subject_name, attempts, total_correct, total_questions) rows for a user."""
+    if current_app.config.get('STATS_ROLLUP_ENABLED'):
+        return db.session.query(
+            Subject.name,
+            UserSubjectStat.attempts,
+            UserSubjectStat.total_correct,
+            UserSubjectStat.total_questions
+        ).join(
+            Subject, UserSubjectStat.subject_id == Subject.id
+        ).filter(UserSubjectStat.user_id == user_id).all()
+    
+    return db.session.query(
+        Subject.name,
+        func.count(Score.id),
+        func.sum(Score.total_scored),
+        func.sum(Score.max_score)
+    ).select_from(Score).join(
+        Quiz, Score.quiz_id == Quiz.id
+    ).join(
+        Chapter, Quiz.chapter_id == Chapter.id
+    ).join(
+        Subject, Chapter.subject_id == Subject.id
+    ).filter(Score.user_id == user_id).group_by(Subject.id, Subject.name).all()
+
+
+def record_score_rollup(user_id, quiz, total_scored, max_score):
+    """Fold a new attempt into the user's subject rollup. Caller commits."""
+    if not current_app.config.get('STATS_ROLLUP_ENABLED'):
+        return
+    
+    subject_id = db.session.query(Chapter.subject_id).filter_by(id=quiz.chapter_id).scalar()
+    insert = _UPSERT_INSERTS.get(db.session.get_bind(mapper=UserSubjectStat).dialect.name)
+    if insert is not None:
+        # One atomic statement, so concurrent first attempts in a subject cannot collide
+        stmt = insert(UserSubjectStat).values(
+            user_id=user_id,
+            subject_id=subject_id,
+            attempts=1,
+            total_correct=total_scored,
+            total_questions=max_score
+        )
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[UserSubjectStat.user_id, UserSubjectStat.subject_id],
+            set_={
+                'attempts': UserSubjectStat.attempts + stmt.excluded.attempts,
+                'total_correct': UserSubjectStat.total_correct + stmt.excluded.total_correct,
+                'total_questions': UserSubjectStat.total_questions + stmt.excluded.total_questions
+            }
+        ))
+        return
+    
+    def increment():
+        return UserSubjectStat.query.filter_by(user_id=user_id, subject_id=subject_id).update({
+            UserSubjectStat.attempts: UserSubjectStat.attempts + 1,
+            UserSubjectStat.total_correct: UserSubjectStat.total_correct + total_scored,
+            UserSubjectStat.total_questions: UserSubjectStat.total_questions + max_score
+        }, synchronize_session=False)
+    
+    if increment():
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(UserSubjectStat(
+                user_id=user_id,
+                subject_id=subject_id,
+                attempts=1,
+                total_correct=total_scored,
+                total_questions=max_score
+            ))
+    except IntegrityError:
+        # Another request inserted the row first
+        increment()
+
+
+def subtract_score_rollups(*score_filters):
+    """Take the scores matching score_filters out of the rollup before they are deleted. Caller commits."""
+    if not current_app.config.get('STATS_ROLLUP_ENABLED'):
+        return
+    
+    rows = db.session.query(
+        Score.user_id,
+        Chapter.subject_id,
+        func.count(Score.id),
+        func.sum(Score.total_scored),
+        func.sum(Score.max_score)
+    ).join(
+        Quiz, Score.quiz_id == Quiz.id
+    ).join(
+        Chapter, Quiz.chapter_id == Chapter.id
+    ).filter(*score_filters).group_by(Score.user_id, Chapter.subject_id).execution_options(
+        include_deleted=True
+    ).all()
+    
+    for user_id, subject_id, attempts, total_correct, total_questions in rows:
+        stat = UserSubjectStat.query.filter_by(user_id=user_id, subject_id=subject_id)
+        stat.update({
+            UserSubjectStat.attempts: UserSubjectStat.attempts - attempts,
+            UserSubjectStat.total_correct: UserSubjectStat.total_correct - total_correct,
+            UserSubjectStat.total_questions: UserSubjectStat.total_questions - total_questions
+        }, synchronize_session=False)
+        # Like the live query, subjects without attempts have no rollup row
+        stat.filter(UserSubjectStat.attempts <= 0).delete(synchronize_session=False)
+
+
+def rebuild_subject_rollups():
+    """Recompute the whole rollup table from scores, e.g. after enabling it."""
+    UserSubjectStat.query.delete(synchronize_session=False)
+    
+    rows = db.session.query(
+        Score.user_id,
+        Chapter.subject_id,
+        func.count(Score.id),
+        func.sum(Score.total_scored),
+        func.sum(Score.max_score)
+    ).join(
+        Quiz, Score.quiz_id == Quiz.id
+    ).join(
+        Chapter, Quiz.chapter_id == Chapter.id
+    ).group_by(Score.user_id, Chapter.subject_id).all()
+    
+    db.session.bulk_insert_mappings(UserSubjectStat, [
+        {
+            'user_id': user_id,
+            'subject_id': subject_id,
+            'attempts': attempts,
+            'total_correct': total_correct,
+            'total_questions': total_questions
+        }
+        for user_id, subject_id, attempts, total_correct, total_questions in rows
+    ])
+    db.session.commit()
+    return len(rows)
@@ -0,0 +1,219 @@
+# app/utils/submission_queue.py
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+from app.extensions import db
+from app.models import Quiz, Score, SpoolBatch
+from app.utils.stats import record_score_rollup
+from app.utils.cache import bump_generation
+
+
+# Guards the active spool file and the flusher thread of this process
+_lock = threading.Lock()
+_flusher = None
+# Failed flushes per claimed spool file; past SUBMISSION_SPOOL_MAX_ATTEMPTS it is set aside
+_failures = {}
+
+# How long written spool files are remembered, i.e. how late a crashed flush may be replayed
+SPOOL_BATCH_RETENTION = timedelta(days=7)
+
+
+def _spool_dir(app):
+    spool_dir = app.config.get('SUBMISSION_SPOOL_DIR') or os.path.join(app.instance_path, 'score_spool')
+    os.makedirs(spool_dir, exist_ok=True)
+    return spool_dir
+
+
+def _active_path(app):
+    return os.path.join(_spool_dir(app), f"{os.getpid()}.jsonl")
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def enqueue_score(quiz_id, user_id, total_scored, max_score):
+    """Durably spool a graded attempt and return it as a provisional score dict."""
+    app = current_app._get_current_object()
+    record = {
+        'quiz_id': quiz_id,
+        'user_id': user_id,
+        'time_stamp_of_attempt': datetime.utcnow().isoformat(),
+        'total_scored': total_scored,
+        'max_score': max_score
+    }
+    
+    line = json.dumps(record) + '\n'
+    with _lock:
+        with open(_active_path(app), 'a') as spool:
+            spool.write(line)
+            spool.flush()
+            os.fsync(spool.fileno())
+    
+    _ensure_flusher(app)
+    return record
+
+
+def _ensure_flusher(app):
+    global _flusher
+    with _lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        first_start = _flusher is None
+        _flusher = threading.Thread(
+            target=_flush_loop,
+            args=(app,),
+            name='score-spool-flusher',
+            daemon=True
+        )
+        _flusher.start()
+    
+    if first_start:
+        atexit.register(_flush_at_exit, app)
+
+
+def _flush_loop(app):
+    interval = app.config.get('SUBMISSION_FLUSH_INTERVAL', 1.0)
+    while True:
+        time.sleep(interval)
+        _flush_at_exit(app)
+
+
+def _flush_at_exit(app):
+    try:
+        with app.app_context():
+            flush_spool(app)
+    except Exception as e:
+        print(f"Failed to flush score spool: {str(e)}")
+
+
+def _claim_spools(app):
+    """Rename this process's spool, and any left by dead processes, to files only we flush."""
+    spool_dir = _spool_dir(app)
+    pid = os.getpid()
+    claimed = []
+    
+    with _lock:
+        for name in sorted(os.listdir(spool_dir)):
+            owner = name.split('.', 1)[0]
+            if not owner.isdigit() or name.endswith('.dead'):
+                continue
+            owner = int(owner)
+            path = os.path.join(spool_dir, name)
+            
+            if owner == pid and name.endswith('.flushing'):
+                # Left over from a flush that failed earlier in this process
+                claimed.append(path)
+                continue
+            if owner != pid and _process_alive(owner):
+                continue
+            
+            target = os.path.join(spool_dir, f"{pid}.{time.time_ns()}.flushing")
+            try:
+                os.replace(path, target)
+            except FileNotFoundError:
+                # Another process claimed the orphan first
+                continue
+            claimed.append(target)
+    
+    return claimed
+
+
+def _read_spool(path):
+    """Return (digest of the file contents, parsed rows)."""
+    with open(path, 'rb') as spool:
+        content = spool.read()
+    
+    rows = []
+    for line in content.decode('utf-8').splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # A torn last line from a crash mid-write
+            print(f"Skipping unreadable spool line in {path}")
+            continue
+        record['time_stamp_of_attempt'] = datetime.fromisoformat(record['time_stamp_of_attempt'])
+        rows.append(record)
+    return hashlib.sha256(content).hexdigest(), rows
+
+
+def _flush_file(app, path):
+    digest, rows = _read_spool(path)
+    if rows and db.session.get(SpoolBatch, digest) is not None:
+        # Committed before a crash kept us from removing the file
+        print(f"Spool file {path} was already written, removing it")
+        rows = []
+    
+    if rows:
+        batch_size = app.config.get('SUBMISSION_BATCH_SIZE', 500)
+        try:
+            # One transaction per spool file, executemany in chunks. The digest is
+            # recorded in the same transaction, so a replayed file is skipped above
+            for start in range(0, len(rows), batch_size):
+                db.session.execute(Score.__table__.insert(), rows[start:start + batch_size])
+            
+            if app.config.get('STATS_ROLLUP_ENABLED'):
+                quiz_ids = {row['quiz_id'] for row in rows}
+                quizzes = {quiz.id: quiz for quiz in Quiz.query.filter(Quiz.id.in_(quiz_ids))}
+                for row in rows:
+                    quiz = quizzes.get(row['quiz_id'])
+                    if quiz:
+                        record_score_rollup(row['user_id'], quiz, row['total_scored'], row['max_score'])
+            
+            db.session.add(SpoolBatch(digest=digest))
+            SpoolBatch.query.filter(
+                SpoolBatch.applied_at < datetime.utcnow() - SPOOL_BATCH_RETENTION
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    
+    os.remove(path)
+    if rows:
+        bump_generation(*{f"scores_{row['user_id']}" for row in rows})
+    return len(rows)
+
+
+def flush_spool(app=None):
+    """Insert every spooled attempt into the score table. Returns the number of rows written.
+    
+    A file that keeps failing for reasons other than the database being unreachable
+    is renamed to .dead after SUBMISSION_SPOOL_MAX_ATTEMPTS tries so it stops
+    holding up the others.
+    """
+    app = app or current_app._get_current_object()
+    max_attempts = app.config.get('SUBMISSION_SPOOL_MAX_ATTEMPTS', 5)
+    written = 0
+    
+    for path in _claim_spools(app):
+        try:
+            written += _flush_file(app, path)
+        except OperationalError:
+            # Database down or locked: leave every file for the next round
+            raise
+        except Exception as e:
+            _failures[path] = _failures.get(path, 0) + 1
+            if _failures[path] < max_attempts:
+                print(f"Failed to flush spool file {path} (attempt {_failures[path]}): {str(e)}")
+                continue
+            del _failures[path]
+            dead_path = path[:-len('.flushing')] + '.dead'
+            os.replace(path, dead_path)
+            print(f"Gave up on spool file {path} after {max_attempts} attempts, moved to {dead_path}: {str(e)}")
+        else:
+            _failures.pop(path, None)
+    
+    return written
@@ -0,0 +1,114 @@
+# benchmarks/login_throughput.py
+# Login storm: many clients log in at once (exam start) while a probe client keeps making
+# cheap requests. Compares hashing with one thread per request (unbounded) against the
+# bounded pool in app/utils/password_hashing.py, and times the unknown-username fast reject.
+#
+# Usage: python -m benchmarks.login_throughput [--clients 64] [--seconds 10]
+import argparse
+import os
+import tempfile
+import threading
+import time
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Role
+from app.utils import password_hashing
+
+
+USERS = 200
+PASSWORD = 'load-test'
+
+
+def make_config(path, workers, max_pending):
+    class LoginBenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        CACHE_REDIS_URL = ''
+        RATELIMIT_ENABLED = False
+        PASSWORD_HASH_WORKERS = workers
+        PASSWORD_HASH_MAX_PENDING = max_pending
+    return LoginBenchConfig
+
+
+def p95(values):
+    return sorted(values)[int(len(values) * 0.95)] * 1000 if values else 0
+
+
+def run(label, clients, seconds, workers, max_pending):
+    path = os.path.join(tempfile.mkdtemp(), 'login.db')
+    app = create_app(make_config(path, workers, max_pending))
+    # Each run builds its own pool from its config
+    password_hashing._executor_pid = None
+    with app.app_context():
+        db.create_all()
+        template = User(username='template', full_name='Template', role=Role.USER)
+        template.set_password(PASSWORD)
+        db.session.execute(db.insert(User), [
+            {'username': f'user{i}@example.com', 'full_name': f'User {i}', 'role': Role.USER,
+             'password_hash': template.password_hash}
+            for i in range(USERS)
+        ])
+        db.session.commit()
+
+    logins = []
+    probes = []
+    failures = [0]
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def login_client(index):
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.post('/api/auth/login', json={'username': f'user{index % USERS}@example.com',
+                                                            'password': PASSWORD})
+            elapsed = time.perf_counter() - started
+            client.post('/api/auth/logout')
+            with lock:
+                if response.status_code == 200:
+                    logins.append(elapsed)
+                else:
+                    failures[0] += 1
+            if response.status_code == 503:
+                time.sleep(float(response.headers.get('Retry-After', 1)))
+
+    def probe_client():
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get('/api/auth/current_user')
+            probes.append(time.perf_counter() - started)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_client, args=(i,)) for i in range(clients)]
+    threads.append(threading.Thread(target=probe_client))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    client = app.test_client()
+    started = time.perf_counter()
+    for _ in range(100):
+        client.post('/api/auth/login', json={'username': 'nobody@example.com', 'password': PASSWORD})
+    reject_ms = (time.perf_counter() - started) * 10
+
+    print(f"{label}: {len(logins) / seconds:6.1f} logins/s (p95 {p95(logins):7.1f} ms), "
+          f"probe p95 {p95(probes):6.1f} ms, {failures[0]} rejected, unknown user {reject_ms:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    # One hash per request thread, no limit: what inline hashing in the view amounts to
+    run('unbounded', args.clients, args.seconds, workers=args.clients, max_pending=args.clients)
+    run('bounded  ', args.clients, args.seconds, workers=None, max_pending=None)
+
+
+if __name__ == '__main__':
+    main()
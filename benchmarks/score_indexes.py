@@ -0,0 +1,140 @@
+# benchmarks/score_indexes.py
+# Query plans and latency of the hot Score/Question/Quiz filters, without and with
+# the indexes declared in app/models.py, on a synthetic SQLite database.
+#
+# Usage: python -m benchmarks.score_indexes [--scores 1000000]
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, text
+from app.extensions import db
+from app.models import Score, Question, Quiz, Chapter, ExportRequest, MonthlyUserReport
+
+
+INDEXED_MODELS = (Score, Question, Quiz, Chapter, ExportRequest, MonthlyUserReport)
+
+QUERIES = [
+    ('score history for a user',
+     'SELECT id, quiz_id, total_scored, max_score FROM score WHERE user_id = :user_id ORDER BY id'),
+    ('7-day attempt count for a user',
+     'SELECT COUNT(*) FROM score WHERE user_id = :user_id AND time_stamp_of_attempt >= :since'),
+    ('attempts on a quiz',
+     'SELECT COUNT(*), AVG(total_scored * 100.0 / max_score) FROM score WHERE quiz_id = :quiz_id'),
+    ('one month of attempts',
+     'SELECT user_id, COUNT(*) FROM score WHERE time_stamp_of_attempt >= :month_start '
+     'AND time_stamp_of_attempt < :month_end GROUP BY user_id'),
+    ('answer key for a quiz',
+     'SELECT id, correct_option FROM question WHERE quiz_id = :quiz_id'),
+    ('quizzes in a chapter',
+     'SELECT id FROM quiz WHERE chapter_id = :chapter_id'),
+    ('chapters in a subject',
+     'SELECT id FROM chapter WHERE subject_id = :subject_id'),
+]
+
+
+def populate(engine, scores, users=10000, subjects=20, chapters_per_subject=10, quizzes_per_chapter=10,
+             questions_per_quiz=10):
+    rng = random.Random(42)
+    now = datetime(2025, 6, 1)
+    with engine.begin() as connection:
+        connection.execute(db.metadata.tables['user'].insert(), [
+            {'id': i, 'username': f'user{i}@example.com', 'password_hash': 'x', 'full_name': f'User {i}',
+             'role': 'USER'}
+            for i in range(1, users + 1)
+        ])
+        connection.execute(db.metadata.tables['subject'].insert(), [
+            {'id': i, 'name': f'Subject {i}'} for i in range(1, subjects + 1)
+        ])
+        chapters = subjects * chapters_per_subject
+        connection.execute(db.metadata.tables['chapter'].insert(), [
+            {'id': i, 'name': f'Chapter {i}', 'subject_id': (i - 1) // chapters_per_subject + 1}
+            for i in range(1, chapters + 1)
+        ])
+        quizzes = chapters * quizzes_per_chapter
+        connection.execute(db.metadata.tables['quiz'].insert(), [
+            {'id': i, 'chapter_id': (i - 1) // quizzes_per_chapter + 1,
+             'date_of_quiz': (now - timedelta(days=i % 365)).date(), 'time_duration': '00:30'}
+            for i in range(1, quizzes + 1)
+        ])
+        connection.execute(db.metadata.tables['question'].insert(), [
+            {'quiz_id': (i - 1) // questions_per_quiz + 1, 'question_statement': f'Question {i}',
+             'option1': 'a', 'option2': 'b', 'option3': 'c', 'option4': 'd', 'correct_option': i % 4 + 1}
+            for i in range(1, quizzes * questions_per_quiz + 1)
+        ])
+
+        batch = []
+        for i in range(scores):
+            batch.append({
+                'quiz_id': rng.randint(1, quizzes),
+                'user_id': rng.randint(1, users),
+                'time_stamp_of_attempt': now - timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+                'total_scored': rng.randint(0, questions_per_quiz),
+                'max_score': questions_per_quiz
+            })
+            if len(batch) == 50000:
+                connection.execute(db.metadata.tables['score'].insert(), batch)
+                batch = []
+        if batch:
+            connection.execute(db.metadata.tables['score'].insert(), batch)
+    return {'user_id': users // 2, 'quiz_id': quizzes // 2, 'chapter_id': chapters // 2,
+            'subject_id': subjects // 2, 'since': now - timedelta(days=7),
+            'month_start': datetime(2025, 4, 1), 'month_end': datetime(2025, 5, 1)}
+
+
+def measure(engine, params, repeat):
+    results = {}
+    with engine.connect() as connection:
+        for name, sql in QUERIES:
+            plan = connection.execute(text('EXPLAIN QUERY PLAN ' + sql), params).all()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                connection.execute(text(sql), params).all()
+            elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+            results[name] = (elapsed_ms, ' / '.join(row[-1] for row in plan))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scores', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+
+    # Start from the pre-migration schema: no secondary indexes
+    with engine.begin() as connection:
+        for model in INDEXED_MODELS:
+            for index in model.__table__.indexes:
+                index.drop(bind=connection)
+
+    print(f"Populating {args.scores} scores...")
+    params = populate(engine, args.scores)
+    with engine.begin() as connection:
+        connection.execute(text('ANALYZE'))
+
+    before = measure(engine, params, args.repeat)
+
+    with engine.begin() as connection:
+        for model in INDEXED_MODELS:
+            for index in model.__table__.indexes:
+                index.create(bind=connection)
+        connection.execute(text('ANALYZE'))
+
+    after = measure(engine, params, args.repeat)
+
+    for name, _ in QUERIES:
+        before_ms, before_plan = before[name]
+        after_ms, after_plan = after[name]
+        print(f"\n{name}")
+        print(f"  before: {before_ms:9.2f} ms  {before_plan}")
+        print(f"  after:  {after_ms:9.2f} ms  {after_plan}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# benchmarks/sqlite_load.py
+# Concurrent quiz submissions and dashboard reads against a file-backed SQLite database,
+# with the SQLite profile from app/utils/db_tuning.py off (stock engine) and on.
+#
+# Usage: python -m benchmarks.sqlite_load [--writers 4] [--readers 8] [--seconds 10]
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Role, Subject, Chapter, Quiz, Question, Score
+
+
+USERS = 50
+QUIZZES = 10
+QUESTIONS_PER_QUIZ = 10
+SEED_SCORES = 100000
+PASSWORD = 'load-test'
+
+
+def make_config(path, tuned):
+    class LoadTestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLITE_TUNING_ENABLED = tuned
+        CACHE_REDIS_URL = ''
+        RATELIMIT_ENABLED = False
+        SUBMISSION_QUEUE_ENABLED = False
+    return LoadTestConfig
+
+
+def seed(app):
+    rng = random.Random(42)
+    today = datetime.now().date()
+    with app.app_context():
+        db.create_all()
+        subject = Subject(name='Load test')
+        chapter = Chapter(name='Load test', subject=subject)
+        db.session.add_all([subject, chapter])
+        db.session.flush()
+        for _ in range(QUIZZES):
+            quiz = Quiz(chapter_id=chapter.id, date_of_quiz=today - timedelta(days=1), time_duration='00:30')
+            db.session.add(quiz)
+            db.session.flush()
+            db.session.add_all([
+                Question(quiz_id=quiz.id, question_statement=f'Question {i}', option1='a', option2='b',
+                         option3='c', option4='d', correct_option=i % 4 + 1)
+                for i in range(QUESTIONS_PER_QUIZ)
+            ])
+
+        template = User(username='template', full_name='Template', role=Role.USER)
+        template.set_password(PASSWORD)
+        db.session.execute(db.insert(User), [
+            {'username': f'user{i}@example.com', 'full_name': f'User {i}', 'role': Role.USER,
+             'password_hash': template.password_hash}
+            for i in range(USERS)
+        ])
+        db.session.commit()
+
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).all()]
+        quiz_ids = [quiz_id for (quiz_id,) in db.session.query(Quiz.id).all()]
+        db.session.execute(db.insert(Score), [
+            {'quiz_id': rng.choice(quiz_ids), 'user_id': rng.choice(user_ids),
+             'time_stamp_of_attempt': datetime.utcnow() - timedelta(minutes=rng.randint(0, 60 * 24 * 90)),
+             'total_scored': rng.randint(0, QUESTIONS_PER_QUIZ), 'max_score': QUESTIONS_PER_QUIZ}
+            for _ in range(SEED_SCORES)
+        ])
+        db.session.commit()
+        return quiz_ids
+
+
+def run(tuned, writers, readers, seconds):
+    path = os.path.join(tempfile.mkdtemp(), 'load.db')
+    app = create_app(make_config(path, tuned))
+    quiz_ids = seed(app)
+    with app.app_context():
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+
+    counts = {'submit': 0, 'dashboard': 0, 'errors': 0}
+    latencies = {'submit': [], 'dashboard': []}
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(writers + readers + 1)
+    stop = threading.Event()
+
+    def worker(index, kind):
+        client = app.test_client()
+        client.post('/api/auth/login', json={'username': f'user{index % USERS}@example.com', 'password': PASSWORD})
+        rng = random.Random(index)
+        start_barrier.wait()
+        request_number = 0
+        while not stop.is_set():
+            request_number += 1
+            started = time.perf_counter()
+            if kind == 'submit':
+                quiz_id = rng.choice(quiz_ids)
+                response = client.post(f'/api/user/quiz/{quiz_id}/submit', json={'answers': {}})
+            else:
+                # Unique query string so every read misses the response cache and hits the database
+                response = client.get(f'/api/user/statistics?n={request_number}')
+            elapsed = time.perf_counter() - started
+            with lock:
+                if response.status_code == 200:
+                    counts[kind] += 1
+                    latencies[kind].append(elapsed)
+                else:
+                    counts['errors'] += 1
+
+    threads = [threading.Thread(target=worker, args=(i, 'submit')) for i in range(writers)]
+    threads += [threading.Thread(target=worker, args=(writers + i, 'dashboard')) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    def p95(values):
+        return sorted(values)[int(len(values) * 0.95)] * 1000 if values else 0
+
+    label = 'tuned' if tuned else 'stock'
+    print(f"{label} (journal_mode={journal_mode}): "
+          f"{counts['submit'] / seconds:7.1f} submits/s (p95 {p95(latencies['submit']):6.1f} ms), "
+          f"{counts['dashboard'] / seconds:7.1f} dashboards/s (p95 {p95(latencies['dashboard']):6.1f} ms), "
+          f"{counts['errors']} errors")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    for tuned in (False, True):
+        run(tuned, args.writers, args.readers, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import os
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_init
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,7 +18,9 @@ celery_app = Celery(
     include=[
         'app.tasks.reminder_tasks', 
         'app.tasks.report_tasks',
-        'app.tasks.export_tasks'  # Add this line
+        'app.tasks.export_tasks',
+        'app.tasks.email_tasks',
+        'app.tasks.purge_tasks'
     ]
 )
 
@@ -39,4 +42,47 @@ celery_app.conf.beat_schedule = {
         'task': 'app.tasks.report_tasks.send_monthly_reports',
         'schedule': crontab(day_of_month=1, hour=8, minute=0),
     },
-}
\ No newline at end of file
+    'purge-deleted-catalog': {
+        'task': 'app.tasks.purge_tasks.purge_deleted_catalog',
+        'schedule': crontab(hour=3, minute=0),
+    },
+}
+
+
+# One Flask app per worker process, shared by every task it runs
+_flask_app = None
+
+
+def get_flask_app():
+    """Return this process's Flask app, creating it on first use.
+    
+    Inside a request (e.g. a task called directly from a view) the running app is reused.
+    """
+    global _flask_app
+    from flask import current_app, has_app_context
+    if has_app_context():
+        return current_app._get_current_object()
+    if _flask_app is None:
+        from app import create_app
+        from app.config import WorkerConfig
+        _flask_app = create_app(WorkerConfig)
+    return _flask_app
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Build the app once per forked worker so tasks skip create_app()."""
+    global _flask_app
+    from app.extensions import db
+    
+    # Never reuse an app or connections inherited from the parent process
+    if _flask_app is not None:
+        with _flask_app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+    _flask_app = None
+    
+    app = get_flask_app()
+    with app.app_context():
+        # Open the pool now rather than inside the first task
+        db.engine.connect().close()
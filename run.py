@@ -2,6 +2,7 @@
 from app import create_app
 from app.extensions import db
 from app.models import User, Role
+from app.utils.migrations import upgrade_database
 from werkzeug.security import generate_password_hash
 import os
 
@@ -11,7 +12,7 @@ exports_dir = os.path.join(app.static_folder, 'exports')
 os.makedirs(exports_dir, exist_ok=True)
 # Initialize database within app context
 with app.app_context():
-    db.create_all()
+    upgrade_database()
     print("Database schema updated!")
     # Check if admin exists
     admin = User.query.filter_by(role=Role.ADMIN).first()
@@ -0,0 +1,94 @@
+# tests/test_purge.py
+from datetime import date, datetime, timedelta
+import pytest
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Role, Subject, Chapter, Quiz, Question, Score, UserSubjectStat
+from app.utils.catalog_delete import delete_catalog
+from app.utils.stats import record_score_rollup, get_subject_rollups
+from app.tasks.purge_tasks import purge_deleted_catalog
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        CACHE_REDIS_URL = ''
+        RATELIMIT_ENABLED = False
+        SOFT_DELETE_ENABLED = True
+        STATS_ROLLUP_ENABLED = True
+        PURGE_CHUNK_SIZE = 1
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+def _quiz_with_attempts(user, attempts=2):
+    subject = Subject(name='Math')
+    db.session.add(subject)
+    db.session.flush()
+    chapter = Chapter(name='Algebra', subject_id=subject.id)
+    db.session.add(chapter)
+    db.session.flush()
+    quiz = Quiz(chapter_id=chapter.id, date_of_quiz=date.today(), time_duration='00:10')
+    db.session.add(quiz)
+    db.session.flush()
+    db.session.add(Question(quiz_id=quiz.id, question_statement='1 + 1?', option1='1', option2='2',
+                            option3='3', option4='4', correct_option=2))
+    for _ in range(attempts):
+        db.session.add(Score(quiz_id=quiz.id, user_id=user.id, total_scored=1, max_score=1))
+        record_score_rollup(user.id, quiz, 1, 1)
+    db.session.commit()
+    return subject, chapter, quiz
+
+
+def _count(model):
+    return db.session.execute(
+        db.select(db.func.count()).select_from(model),
+        execution_options={'include_deleted': True}
+    ).scalar()
+
+
+@pytest.mark.parametrize('entity', ['subject', 'chapter', 'quiz'])
+def test_purge_removes_scores_of_soft_deleted_rows(app, entity):
+    user = User(username='student@example.com', full_name='Student', role=Role.USER, password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    subject, chapter, quiz = _quiz_with_attempts(user)
+    row_id = {'subject': subject.id, 'chapter': chapter.id, 'quiz': quiz.id}[entity]
+
+    delete_catalog(entity, [row_id])
+    db.session.commit()
+    assert _count(Score) == 2
+
+    # Backdate the soft delete past the retention window
+    model = {'subject': Subject, 'chapter': Chapter, 'quiz': Quiz}[entity]
+    db.session.execute(db.update(model).where(model.id == row_id)
+                       .values(deleted_at=datetime.utcnow() - timedelta(days=2)))
+    db.session.commit()
+    purge_deleted_catalog(retention_days=1)
+
+    assert _count(Score) == 0
+    assert _count(Question) == 0
+    assert _count(Quiz) == 0
+    assert _count(UserSubjectStat) == 0
+
+
+def test_rollups_match_live_stats_after_delete(app):
+    user = User(username='student@example.com', full_name='Student', role=Role.USER, password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    _, _, quiz = _quiz_with_attempts(user)
+    _quiz_with_attempts(user, attempts=1)
+
+    delete_catalog('quiz', [quiz.id])
+    db.session.commit()
+
+    rollups = get_subject_rollups(user.id)
+    app.config['STATS_ROLLUP_ENABLED'] = False
+    assert [tuple(row) for row in rollups] == [tuple(row) for row in get_subject_rollups(user.id)]
+    assert len(rollups) == 1